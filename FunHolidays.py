@@ -1,97 +1,180 @@
 import os
 import sys
-import requests
 import json
 from datetime import timedelta, datetime as dt
+from threading import Lock
 from bs4 import BeautifulSoup
+from decouple import config
+from HttpSession import shared_session
+from NewsFiles import atomic_write
 import time
 
 
+FUN_HOLIDAYS_URL = "https://www.timeanddate.com/holidays/fun/"
+# month names of the table (filipino) to english, as strftime("%b") writes them
+ENG_MONTH_NAMES = {
+    "Ene": "Jan",
+    "Peb": "Feb",
+    "Mar": "Mar",
+    "Abr": "Apr",
+    "May": "May",
+    "Hun": "Jun",
+    "Hul": "Jul",
+    "Ago": "Aug",
+    "Set": "Sep",
+    "Oct": "Oct",
+    "Nob": "Nov",
+    "Dis": "Dec"
+}
+
+
 class FunHoliday:
 
+    def __init__(self, cache_file=None, article_ttl=None):
+        # the calendar of the year and the articles we read, a restart doesn't download them again
+        self.cache_file = cache_file if cache_file is not None else config(
+            "FUN_HOLIDAYS_CACHE", default=os.path.join(config("NEWS_DIR", default=""), "FunHolidays.json"))
+        # seconds before the article of a holiday is downloaded again
+        self.article_ttl = article_ttl if article_ttl is not None else config(
+            "FUN_HOLIDAYS_ARTICLE_TTL", default=7 * 24 * 60 * 60, cast=float)
+
+        # {"year": 2020, "calendar": {"01 Jan": [{"title", "source url"}, ...]},
+        #  "articles": {source url: {"heading", "did you know", "fetched"}}}
+        self.cache = self._load_cache()
+        # (date, answer) of the last query, repeated queries of the day are answered from it
+        self.today = None
+        self._lock = Lock()
+
     def parser(self, url):
-        response = requests.get(url)
+        # holiday pages change once a day, so a 304 still hands back the previous page to parse
+        response = shared_session.get(url)
+        # an error page parses into an empty calendar, don't let it take the place of the real one
+        if not response.ok:
+            raise Exception(f"{url} answered with status {response.status_code}")
         # os.path.dirname(response.url)
         soup = BeautifulSoup(response.text, "html.parser")
         return soup, response.url
 
     def convert_to_eng_month_name(self, date):
-        swither = {
-            "Ene": "Jan",
-            "Peb": "Feb",
-            "Mar": "Mar",
-            "Abr": "Apr",
-            "May": "May",
-            "Hun": "Jun",
-            "Hul": "Jul",
-            "Ago": "Aug",
-            "Set": "Sep",
-            "Oct": "Oct",
-            "Nob": "Nov",
-            "Dis": "Dec"
-        }
-
         temp_date = date.split(" ")
         day = temp_date[0].zfill(2)
         month_name = temp_date[1]
 
-        translation = swither.get(month_name, "")
+        translation = ENG_MONTH_NAMES.get(month_name, "")
         converted_month_name = f"{day} {translation}"  # date.replace(month_name, translation)
         return converted_month_name
 
     def get_fun_holiday(self):
         fun_holiday_result = {"success": "false", "holiday": list()}
-        date_now = dt.now().strftime("%d %b")
-
-        try:
-            soup, base_url = self.parser("https://www.timeanddate.com/holidays/fun/")
-            holidays = soup.find_all("tr")
-
-            for holiday in holidays:
-                table_header_tag = holiday.find_all("th")
-                anchor_tag = holiday.find("a")
-
-                if table_header_tag and anchor_tag:
-                    date = table_header_tag[0].text
-
-                    if self.convert_to_eng_month_name(date) == date_now:
-                        holiday_name = anchor_tag.text
-                        source_url = f"{base_url}{anchor_tag['href'].split('/')[-1]}"
+        now = dt.now()
+        date_now = now.strftime("%d %b")
 
-                        # let's extract contents of articles based on source_url we got
-                        args = self.parser(source_url)
-                        # select the contents of article
-                        article = args[0].select("div", {"class": "article__body"})
-
-                        # extract all paragraphs
-                        paragraph_tag = args[0].find_all("p")
-
-                        # index 1 is expected to be the heading of article
-                        main_heading = paragraph_tag[1].text
-
-                        # find paragraph(s) that starts with (…)
-                        # this will be the "did you know" content
-                        did_you_know = ""
-
-                        for item in paragraph_tag:
-                            if "…" in item.text or "..." in item.text:
-                                did_you_know = item.text
-                                break
-
-                        holiday = {
-                            "date": self.convert_to_eng_month_name(date),
-                            "title": holiday_name,
-                            "heading": main_heading,
-                            "did you know": did_you_know,
-                            "source url": source_url
-                        }
-                        return {"success": "true", "holiday": holiday}
+        # asked already today, no download and no parsing
+        today = self.today
+        if today is not None and today[0] == now.date():
+            return today[1]
 
+        try:
+            with self._lock:
+                calendar = self.calendar(now.year)
+
+                for holiday in calendar.get(date_now, []):
+                    source_url = holiday["source url"]
+                    article = self.article(source_url, now.timestamp())
+
+                    fun_holiday_result = {"success": "true", "holiday": {
+                        "date": date_now,
+                        "title": holiday["title"],
+                        "heading": article["heading"],
+                        "did you know": article["did you know"],
+                        "source url": source_url
+                    }}
+                    break
+
+            self.today = (now.date(), fun_holiday_result)
             return fun_holiday_result
 
         except Exception as ex:
             return {"success": "false", "message": str(ex)}
 
+    def calendar(self, year):
+        # every holiday of the year by date ("01 Jan"), the table is downloaded and parsed once a year
+        if self.cache.get("year") != year:
+            calendar = self.parse_calendar()
+            # a page without the table (changed layout, error page) is tried again on the next call
+            if not calendar:
+                raise Exception("No holidays found in the fun holidays calendar.")
+
+            self.cache = {"year": year, "calendar": calendar,
+                          "articles": self.cache.get("articles", {})}
+            self._save_cache()
+        return self.cache["calendar"]
+
+    def parse_calendar(self):
+        calendar = {}
+        soup, base_url = self.parser(FUN_HOLIDAYS_URL)
+
+        for holiday in soup.find_all("tr"):
+            table_header_tag = holiday.find_all("th")
+            anchor_tag = holiday.find("a")
+
+            if table_header_tag and anchor_tag:
+                date = self.convert_to_eng_month_name(table_header_tag[0].text)
+                calendar.setdefault(date, []).append({
+                    "title": anchor_tag.text,
+                    "source url": f"{base_url}{anchor_tag['href'].split('/')[-1]}"
+                })
+
+        return calendar
+
+    def article(self, source_url, now):
+        # heading and "did you know" of the holiday, downloaded again once it's older than article_ttl
+        article = self.cache["articles"].get(source_url)
+        if article is None or now - article["fetched"] >= self.article_ttl:
+            article = dict(self.parse_article(source_url), fetched=now)
+            self.cache["articles"][source_url] = article
+            self._save_cache()
+        return article
+
+    def parse_article(self, source_url):
+        # let's extract contents of articles based on source_url we got
+        soup, _ = self.parser(source_url)
+
+        # extract all paragraphs
+        paragraph_tag = soup.find_all("p")
+
+        # index 1 is expected to be the heading of article
+        main_heading = paragraph_tag[1].text
+
+        # find paragraph(s) that starts with (…)
+        # this will be the "did you know" content
+        did_you_know = ""
+
+        for item in paragraph_tag:
+            if "…" in item.text or "..." in item.text:
+                did_you_know = item.text
+                break
+
+        return {"heading": main_heading, "did you know": did_you_know}
+
+    def _load_cache(self):
+        if not self.cache_file or not os.path.isfile(self.cache_file):
+            return {}
+
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as fr:
+                cache = json.load(fr)
+            if isinstance(cache.get("calendar"), dict) and isinstance(cache.get("articles"), dict):
+                return cache
+        except (ValueError, AttributeError):
+            pass
+        # unreadable cache only costs us one download of the calendar
+        return {}
+
+    def _save_cache(self):
+        if self.cache_file:
+            atomic_write(self.cache_file, json.dumps(self.cache, indent=4, ensure_ascii=False))
+
 
 if __name__ == "__main__":
     fh = FunHoliday()
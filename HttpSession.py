@@ -0,0 +1,100 @@
+import copy
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from decouple import config
+
+
+class HttpSession:
+
+    def __init__(self, timeout=None, retries=None, pool_size=None, host_concurrency=None, validators_limit=None):
+        self.timeout = timeout if timeout is not None else config(
+            "HTTP_TIMEOUT", default=15, cast=float)
+        retries = retries if retries is not None else config(
+            "HTTP_RETRIES", default=2, cast=int)
+        pool_size = pool_size if pool_size is not None else config(
+            "HTTP_POOL_SIZE", default=10, cast=int)
+        self.host_concurrency = host_concurrency if host_concurrency is not None else config(
+            "HTTP_HOST_CONCURRENCY", default=4, cast=int)
+        self.validators_limit = validators_limit if validators_limit is not None else config(
+            "HTTP_VALIDATORS_LIMIT", default=256, cast=int)
+
+        retry = Retry(total=retries, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(["GET", "HEAD"]))
+        # one connection pool per host, connections are kept alive between cycles
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "User-Agent": "Mozilla/5.0 (NewsScraper)"
+        })
+
+        # url -> last full response, used to send conditional requests (ETag / Last-Modified),
+        # least recently stored first, so the oldest are dropped first
+        self.validators = {}
+        self.stats = {"requests": 0, "not_modified": 0,
+                      "bytes_received": 0, "bytes_saved": 0}
+        # host -> semaphore, limits the number of requests in flight to the same host
+        self.host_slots = {}
+        # recorded fixtures instead of the network, and a recorder of the real responses (see NewsReplay)
+        self.stand_in = None
+        self.recorder = None
+        self._lock = threading.Lock()
+
+    def get(self, url, conditional=True, **kwargs):
+        if self.stand_in is not None:
+            return self.stand_in.get(url)
+
+        headers = dict(kwargs.pop("headers", {}))
+        kwargs.setdefault("timeout", self.timeout)
+
+        with self._lock:
+            cached = self.validators.get(url) if conditional else None
+            host_slot = self.host_slots.setdefault(
+                urlsplit(url).netloc, threading.BoundedSemaphore(self.host_concurrency))
+
+        if cached is not None:
+            if cached.headers.get("ETag"):
+                headers["If-None-Match"] = cached.headers["ETag"]
+            if cached.headers.get("Last-Modified"):
+                headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+
+        with host_slot:
+            response = self.session.get(url, headers=headers, **kwargs)
+
+        with self._lock:
+            self.stats["requests"] += 1
+
+            if response.status_code == 304 and cached is not None:
+                # nothing changed since the last request, hand back a copy of the previous response,
+                # the one kept for the next conditional request is shared by the threads
+                self.stats["not_modified"] += 1
+                self.stats["bytes_saved"] += len(cached.content)
+                response = copy.copy(cached)
+                response.not_modified = True
+                return response
+
+            response.not_modified = False
+            self.stats["bytes_received"] += len(response.content)
+
+            if response.ok and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+                self.validators.pop(url, None)
+                self.validators[url] = response
+                if len(self.validators) > self.validators_limit:
+                    del self.validators[next(iter(self.validators))]
+
+        if self.recorder is not None:
+            self.recorder.record(url, response)
+
+        return response
+
+
+# shared by NewsParser and FunHoliday, so both reuse the same connection pools
+shared_session = HttpSession()
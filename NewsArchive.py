@@ -0,0 +1,82 @@
+import sqlite3
+from datetime import datetime as dt
+from threading import Lock
+from NewsStore import headline_fingerprint
+
+
+class NewsArchive:
+
+    def __init__(self, path):
+        self.path = path
+        # scrapers write from worker threads, so one connection is shared behind a lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()
+
+        with self._lock, self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS news (
+                    fingerprint TEXT PRIMARY KEY,
+                    headline TEXT NOT NULL,
+                    time TEXT NOT NULL,
+                    source TEXT NOT NULL DEFAULT '',
+                    source_url TEXT NOT NULL DEFAULT '',
+                    story TEXT NOT NULL DEFAULT '',
+                    breaking INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS news_time ON news (time);
+                CREATE INDEX IF NOT EXISTS news_source ON news (source, time);
+                CREATE INDEX IF NOT EXISTS news_breaking ON news (breaking, time);
+            """)
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def count(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+    def add(self, news_items):
+        # duplicates are skipped by the unique headline fingerprint
+        rows = [(headline_fingerprint(news.headline), news.headline, news.time_stamp.isoformat(sep=" "),
+                 news.source, news.source_url, news.story, int(news.breaking)) for news in news_items]
+
+        with self._lock, self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO news VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            return self.connection.total_changes - before
+
+    def query(self, since=None, source=None, breaking_only=False, limit=None):
+        # latest first, each row in the same shape as the json news file (time is a datetime)
+        conditions = []
+        parameters = []
+
+        if since is not None:
+            conditions.append("time >= ?")
+            parameters.append(since.isoformat(sep=" "))
+        if source:
+            conditions.append("source = ?")
+            parameters.append(source)
+        if breaking_only:
+            conditions.append("breaking = 1")
+
+        sql = "SELECT headline, time, source, source_url, story, breaking FROM news"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY time DESC"
+        if limit:
+            sql += " LIMIT ?"
+            parameters.append(int(limit))
+
+        with self._lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+
+        return [{
+            "breaking_news": "true" if breaking else "false",
+            "headline": headline,
+            "time": dt.fromisoformat(time_stamp),
+            "source": source,
+            "source url": source_url,
+            "story": story
+        } for headline, time_stamp, source, source_url, story, breaking in rows]
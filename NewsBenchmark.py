@@ -0,0 +1,250 @@
+import io
+import os
+import sys
+import time
+import json
+import tempfile
+import tracemalloc
+import subprocess
+
+
+def measure(stage, repeat=1):
+    # wall and cpu time of one run of stage, then the peak memory allocated by another (traced) run
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    for _ in range(repeat):
+        stage()
+    wall = (time.perf_counter() - start_wall) / repeat
+    cpu = (time.process_time() - start_cpu) / repeat
+
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"wall_ms": wall * 1000, "cpu_ms": cpu * 1000, "peak_alloc_kb": peak / 1024}
+
+
+def use_temp_news_dir():
+    # the ticker saves its news file here, not in the real news directory
+    os.environ["NEWS_DIR"] = tempfile.mkdtemp()
+    os.makedirs(os.path.join(os.environ["NEWS_DIR"], "News"))
+
+
+def run_benchmark(directory, scale):
+    # one data volume, in its own process so the peak rss is only this run's
+    use_temp_news_dir()
+
+    from NewsScraper import NewsTicker
+    from TerminalRenderer import TerminalRenderer
+    from NewsReplay import replay
+
+    def _new_ticker():
+        # an empty store, so every item of the first cycle is new
+        new_ticker = NewsTicker()
+        new_ticker.open_news_file(os.path.join(tempfile.mkdtemp(), "News.json"))
+        replay(new_ticker, directory, scale)
+        return new_ticker
+
+    tickers = []
+    results = {"fetch_news (first)": measure(lambda: tickers.append(_new_ticker()) or tickers[-1].fetch_news())}
+    ticker = tickers[0]
+
+    # the next cycles only find what we already have
+    def _next_cycle():
+        ticker.scrape_breaking_news()
+        ticker.scrape_latest_news()
+
+    results["fetch_news (next)"] = measure(_next_cycle)
+    results["get_news"] = measure(lambda: ticker.get_news(50, one_per_story=True), 100)
+    results["cast_latest_news"] = measure(ticker.cast_latest_news, 10)
+    results["cast_breaking_news"] = measure(lambda: ticker.cast_breaking_news(on_demand=True), 10)
+
+    # draw the ticker of the top 50 headlines into memory, without the pauses between headlines
+    ticker.renderer = TerminalRenderer(fps=0, stream=io.StringIO())
+    ticker.renderer.hold = lambda seconds, interrupt=None: True
+    ticker.window_height = "90 /NOT"
+    top_50_latest_news = ticker.get_news(50, one_per_story=True)
+
+    def _render():
+        # cast_breaking_news leaves the event set, it would stop every headline after its first frame
+        ticker.breaking_news_event.clear()
+        for idx, news in enumerate(top_50_latest_news):
+            ticker.create_news_ticker(news, idx + 1, len(top_50_latest_news))
+
+    results["show_news render"] = measure(_render)
+    results["frames"] = ticker.renderer.frame_count
+    # every headline scrolls through many frames, one frame each means the ticker was interrupted
+    assert results["frames"] > len(top_50_latest_news), "the ticker was interrupted"
+    results["items"] = ticker.count_news()
+    try:
+        import resource
+        results["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        # windows has no resource module, the peak rss is left out
+        pass
+    return results
+
+
+def ticker_benchmark(sizes):
+    # get_news and cast_latest_news on a day of news, against sorting and filtering the "time" strings
+    # of the news file the way the ticker did before it kept datetimes (parsed on every comparison)
+    use_temp_news_dir()
+    import random
+    from datetime import datetime as dt, timedelta
+    from NewsScraper import NewsTicker, news_mapper, TIME_FORMAT
+
+    def _string_time_get_news(news_items):
+        date_time_now = dt.now().strftime(TIME_FORMAT)
+        today = dt.strptime(date_time_now, TIME_FORMAT).date()
+        within_day = [news for news in news_items
+                      if news["time"] is None or dt.strptime(news["time"], TIME_FORMAT).date() == today]
+        return sorted(within_day, key=lambda news: dt.strptime(
+            date_time_now if news["time"] is None else news["time"], TIME_FORMAT), reverse=True)
+
+    generator = random.Random(1)
+    vocabulary = [f"word{idx}" for idx in range(5000)]
+
+    print(f"{'items':>7} {'string times ms':>16} {'get_news ms':>12} {'cast_latest_news ms':>20}")
+    for size in sizes:
+        ticker = NewsTicker()
+        ticker.open_news_file(os.path.join(tempfile.mkdtemp(), "News.json"))
+        # spread over the hours of today that already passed
+        start_of_day = dt.combine(dt.now().date(), dt.min.time())
+        seconds_today = max(int((dt.now() - start_of_day).total_seconds()), 1)
+        ticker.news.extend([news_mapper({
+            "headline": " ".join(generator.choice(vocabulary) for _ in range(generator.randint(6, 16))),
+            "time": start_of_day + timedelta(seconds=idx * 7919 % seconds_today),
+            "source": f"source {idx % 20}",
+            "source url": f"https://example.com/{idx}"
+        }) for idx in range(size)])
+        serialized = [news.serialize() for news in ticker.news]
+
+        before = measure(lambda: _string_time_get_news(serialized), 3)
+        get_news = measure(ticker.get_news, 3)
+        cast = measure(ticker.cast_latest_news, 3)
+        print(f"{size:>7} {before['wall_ms']:>16.2f} {get_news['wall_ms']:>12.2f} {cast['wall_ms']:>20.2f}")
+
+
+def parse_benchmark(directory, repeat=20):
+    # the recorded html pages parsed whole and then searched, against building only the
+    # elements under the selector of the news source (what NewsParser.select does)
+    from bs4 import BeautifulSoup, SoupStrainer
+    from NewsScraper import HTML_PARSER
+    from NewsSources import load_news_sources
+    from NewsReplay import FixtureSession
+
+    session = FixtureSession(directory)
+    print(f"parser: {HTML_PARSER}")
+    print(f"{'page':<34} {'parse':<9} {'wall ms':>10} {'peak alloc KB':>14} {'elements':>9}")
+
+    for news_source in load_news_sources():
+        if news_source["type"] != "html" or news_source["url"] not in session.index:
+            continue
+
+        content = session.get(news_source["url"]).content
+        container = news_source["container"]
+        stages = (
+            ("full", lambda: BeautifulSoup(content, HTML_PARSER).find_all(*container)),
+            ("strained", lambda: BeautifulSoup(content, HTML_PARSER, parse_only=SoupStrainer(*container)).find_all(*container))
+        )
+
+        for title, stage in stages:
+            result = measure(stage, repeat)
+            print(f"{news_source['name'][:34]:<34} {title:<9} {result['wall_ms']:>10.2f} "
+                  f"{result['peak_alloc_kb']:>14.1f} {len(stage()):>9}")
+
+
+def feed_benchmark(directory, entries=100, repeat=20):
+    # one poll of a recorded feed of 100 entries: nothing seen yet (cold), every guid already ingested (warm),
+    # and feedparser reading the whole feed, the way every poll did before
+    import re
+    import feedparser
+    from HttpSession import shared_session
+    from NewsScraper import NewsParser, SeenGuids
+    from NewsSources import load_news_sources
+    from NewsReplay import FixtureSession, FixtureResponse, RSS_TEXT_PATTERN
+
+    session = FixtureSession(directory)
+    for news_source in load_news_sources():
+        if news_source["type"] != "rss" or news_source["url"] not in session.index:
+            continue
+
+        # as many entries as the recorded feed has, copies with their own guid and title fill up the rest
+        body = session.get(news_source["url"]).content
+        items = re.findall(rb"<item[\s>].*?</item>", body, re.DOTALL)
+        if not items:
+            continue
+        copies = [items[idx % len(items)] if idx < len(items) else RSS_TEXT_PATTERN.sub(
+            lambda match: match.group(1) + match.group(3) + f" ({idx})".encode() + match.group(4), items[idx % len(items)])
+            for idx in range(entries)]
+        head, tail = body[:body.index(items[0])], body[body.rindex(items[-1]) + len(items[-1]):]
+        feed = head + b"".join(copies) + tail
+
+        url = news_source["url"]
+        shared_session.stand_in = SimpleFeedSession(FixtureResponse(url, 200, {}, feed))
+
+        # a ticker that already ingested every guid of the feed
+        seen_guids = SeenGuids()
+        NewsParser(url).parse_feed(seen_guids=seen_guids)
+
+        def _cold():
+            return NewsParser(url).parse_feed(seen_guids=SeenGuids())
+
+        def _warm():
+            return NewsParser(url).parse_feed(seen_guids=seen_guids)
+
+        print(f"{news_source['name']} | {entries} entries | {len(feed) / 1024:.1f} KB")
+        print(f"{'poll':<11} {'wall ms':>10} {'peak alloc KB':>14} {'items':>6}")
+        for title, stage in (("feedparser", lambda: feedparser.parse(feed).entries), ("cold", _cold), ("warm", _warm)):
+            result = measure(stage, repeat)
+            print(f"{title:<11} {result['wall_ms']:>10.2f} {result['peak_alloc_kb']:>14.1f} {len(stage()):>6}")
+        shared_session.stand_in = None
+
+
+class SimpleFeedSession:
+    # answers every url with the same response
+
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+
+if __name__ == "__main__":
+    # python NewsBenchmark.py <fixtures directory> [scales, default 1,10,100]
+    # fixtures are recorded from a real cycle with: python NewsReplay.py <fixtures directory>
+    if len(sys.argv) > 3 and sys.argv[1] == "--run":
+        print(json.dumps(run_benchmark(sys.argv[2], int(sys.argv[3]))))
+        sys.exit()
+
+    # python NewsBenchmark.py --parse <fixtures directory>
+    if len(sys.argv) > 2 and sys.argv[1] == "--parse":
+        parse_benchmark(sys.argv[2])
+        sys.exit()
+
+    # python NewsBenchmark.py --feed <fixtures directory>
+    if len(sys.argv) > 2 and sys.argv[1] == "--feed":
+        feed_benchmark(sys.argv[2])
+        sys.exit()
+
+    # python NewsBenchmark.py --ticker [store sizes, default 1000,5000,20000]
+    if len(sys.argv) > 1 and sys.argv[1] == "--ticker":
+        ticker_benchmark([int(size) for size in (sys.argv[2] if len(sys.argv) > 2 else "1000,5000,20000").split(",")])
+        sys.exit()
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else "fixtures"
+    scales = [int(scale) for scale in (sys.argv[2] if len(sys.argv) > 2 else "1,10,100").split(",")]
+
+    for scale in scales:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", directory, str(scale)],
+                                capture_output=True, text=True, check=True).stdout
+        results = json.loads(output.strip().splitlines()[-1])
+
+        peak_rss_kb = results.pop("peak_rss_kb", None)
+        print(f"\n{scale}x | {results.pop('items')} items | {results.pop('frames')} frames" +
+              (f" | peak rss {peak_rss_kb / 1024:.1f} MB" if peak_rss_kb is not None else ""))
+        print(f"{'stage':<20} {'wall ms':>10} {'cpu ms':>10} {'peak alloc KB':>14}")
+        for stage, result in results.items():
+            print(f"{stage:<20} {result['wall_ms']:>10.2f} {result['cpu_ms']:>10.2f} {result['peak_alloc_kb']:>14.1f}")
@@ -0,0 +1,219 @@
+import re
+import zlib
+import random
+from functools import lru_cache
+from threading import RLock
+from decouple import config
+from NewsText import URL_PATTERN, tokenize
+
+
+# "BREAKING:", "JUST IN -", ... added by twitter accounts in front of the headline
+PREFIX_PATTERN = re.compile(
+    r"^\s*(breaking news|breaking|just in|developing|update|watch|look)\s*[:|\-–—]\s*", re.IGNORECASE)
+# " - Rappler", " | Inquirer.net", ... added by google news at the end of the headline
+SUFFIX_PATTERN = re.compile(r"\s+[|\-–—]\s+(?:[^\s|\-–—]+\s?){1,4}$")
+STOP_WORDS = frozenset((
+    "a", "an", "the", "and", "or", "but", "of", "in", "on", "at", "to", "for", "from", "by", "with",
+    "as", "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "after", "over",
+    "into", "about", "says", "said", "amid", "new", "news"))
+
+# largest mersenne prime below 2^61, the minhash permutations are (a * x + b) mod MERSENNE_PRIME
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def headline_shingles(headline):
+    # words of the headline without the outlet's decorations, the set we compare headlines with
+    headline = URL_PATTERN.sub(" ", str(headline))
+    headline = SUFFIX_PATTERN.sub("", PREFIX_PATTERN.sub("", headline))
+    return frozenset(token for token in tokenize(headline) if token not in STOP_WORDS)
+
+
+def jaccard(shingles, other_shingles):
+    if not shingles or not other_shingles:
+        return 0.0
+    return len(shingles & other_shingles) / len(shingles | other_shingles)
+
+
+class NewsClusterIndex:
+
+    def __init__(self, threshold=None, bands=20, rows=3, seed=1):
+        # headlines with at least this much word overlap (jaccard) are the same story
+        self.threshold = threshold if threshold is not None else config(
+            "STORY_SIMILARITY", default=0.5, cast=float)
+        self.bands = bands
+        self.rows = rows
+
+        generator = random.Random(seed)
+        self._permutations = [(generator.randrange(1, MERSENNE_PRIME), generator.randrange(0, MERSENNE_PRIME))
+                              for _ in range(bands * rows)]
+        # the same words come back in headline after headline, each one is hashed by every permutation once
+        # (about 2.4 KB per word, the least recently used words are dropped first)
+        self._permuted_hashes = lru_cache(maxsize=config(
+            "STORY_WORD_CACHE", default=4096, cast=int))(self._permute)
+        # (band number, band of the minhash signature) -> keys, similar headlines share at least one bucket
+        self._buckets = {}
+        # key -> (shingles, story id)
+        self._documents = {}
+        self._story_count = 0
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add(self, key, headline):
+        # returns the story id of the headline, a new one when it isn't similar to anything we have
+        shingles = headline_shingles(headline)
+
+        with self._lock:
+            if key in self._documents:
+                return self._documents[key][1]
+
+            bands = self._bands(shingles)
+            story = self._find_story(shingles, bands)
+            if story is None:
+                self._story_count += 1
+                story = self._story_count
+
+            self._documents[key] = (shingles, story)
+            for band in bands:
+                self._buckets.setdefault(band, []).append(key)
+
+            return story
+
+    def story(self, key):
+        document = self._documents.get(key)
+        return document[1] if document is not None else None
+
+    def similar(self, headline):
+        # keys of the headlines that are the same story as this one
+        shingles = headline_shingles(headline)
+        with self._lock:
+            return [key for key in self._candidates(self._bands(shingles))
+                    if jaccard(shingles, self._documents[key][0]) >= self.threshold]
+
+    def clear(self):
+        with self._lock:
+            self._buckets = {}
+            self._documents = {}
+            self._story_count = 0
+
+    def _find_story(self, shingles, bands):
+        best_story = None
+        best_similarity = self.threshold
+
+        # only the headlines sharing a bucket are compared, not the whole index
+        for key in self._candidates(bands):
+            candidate_shingles, candidate_story = self._documents[key]
+            similarity = jaccard(shingles, candidate_shingles)
+            if similarity >= best_similarity:
+                best_story, best_similarity = candidate_story, similarity
+
+        return best_story
+
+    def _candidates(self, bands):
+        candidates = set()
+        for band in bands:
+            candidates.update(self._buckets.get(band, ()))
+        return candidates
+
+    def _bands(self, shingles):
+        # too short to tell stories apart, it's only the same story as an identical headline
+        if len(shingles) < 3:
+            return [("exact", shingles)] if shingles else []
+
+        # minhash signature: the smallest permuted hash of any word, for each permutation
+        signature = map(min, zip(*map(self._permuted_hashes, shingles)))
+        return list(enumerate(zip(*[signature] * self.rows)))
+
+    def _permute(self, shingle):
+        value = zlib.crc32(shingle.encode("utf-8"))
+        return tuple([(a * value + b) % MERSENNE_PRIME for a, b in self._permutations])
+
+
+if __name__ == "__main__":
+    # benchmark: clustering precision / recall and inserts per second, compared to checking every pair.
+    # pass a news json file (a captured day) to measure against the exact pairwise scan on real headlines,
+    # without one a day of headlines is generated with the variations we get from our sources.
+    import sys
+    import json
+    import time
+    from itertools import combinations
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as fr:
+            headlines = [news["headline"] for news in json.load(fr)["news"]]
+        labels = None
+    else:
+        generator = random.Random(7)
+        # a small vocabulary, so unrelated stories share words like real headlines do
+        vocabulary = [f"word{idx}" for idx in range(400)]
+        outlets = ["Rappler", "Inquirer.net", "GMA News Online", "Philstar.com", "ABS-CBN News"]
+        headlines = []
+        labels = []
+
+        for story in range(1500):
+            words = [generator.choice(vocabulary) for _ in range(generator.randint(7, 14))]
+            for _ in range(generator.choice((1, 1, 2, 3, 6))):
+                variant = list(words)
+                # outlets reword a little: drop, add or replace a word or two
+                for _ in range(generator.randint(0, 2)):
+                    del variant[generator.randrange(len(variant))]
+                for _ in range(generator.randint(0, 1)):
+                    variant.insert(generator.randrange(len(variant)), generator.choice(vocabulary))
+                if generator.random() < 0.3:
+                    variant[generator.randrange(len(variant))] = generator.choice(vocabulary)
+                variant = " ".join(variant)
+
+                decoration = generator.random()
+                if decoration < 0.3:
+                    variant = f"{variant} - {generator.choice(outlets)}"
+                elif decoration < 0.5:
+                    variant = f"BREAKING: {variant} https://t.co/{generator.randrange(10 ** 8)}"
+                headlines.append(variant)
+                labels.append(story)
+
+    shingles = [headline_shingles(headline) for headline in headlines]
+
+    def _pairs(stories):
+        members = {}
+        for idx, story in enumerate(stories):
+            members.setdefault(story, []).append(idx)
+        return {pair for group in members.values() for pair in combinations(group, 2)}
+
+    def _score(found, expected):
+        true_positives = len(found & expected)
+        precision = true_positives / len(found) if found else 1.0
+        recall = true_positives / len(expected) if expected else 1.0
+        return precision, recall
+
+    # exact reference: every new headline is compared with every headline before it
+    start = time.perf_counter()
+    exact_stories = []
+    for idx in range(len(headlines)):
+        best_story, best_similarity = None, 0.5
+        for other in range(idx):
+            similarity = jaccard(shingles[idx], shingles[other])
+            if similarity >= best_similarity:
+                best_story, best_similarity = exact_stories[other], similarity
+        exact_stories.append(best_story if best_story is not None else idx)
+    exact_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = NewsClusterIndex(threshold=0.5)
+    lsh_stories = [index.add(idx, headline) for idx, headline in enumerate(headlines)]
+    lsh_elapsed = time.perf_counter() - start
+
+    exact_pairs = _pairs(exact_stories)
+    lsh_pairs = _pairs(lsh_stories)
+
+    print(f"{len(headlines)} headlines")
+    print(f"{'pairwise':<9} | {len(headlines) / exact_elapsed:>9,.0f} inserts/s | {len(set(exact_stories))} stories")
+    print(f"{'minhash':<9} | {len(headlines) / lsh_elapsed:>9,.0f} inserts/s | {len(set(lsh_stories))} stories")
+
+    precision, recall = _score(lsh_pairs, exact_pairs)
+    print(f"minhash vs pairwise | precision {precision:.3f} | recall {recall:.3f}")
+
+    if labels is not None:
+        for title, found in (("pairwise", exact_pairs), ("minhash", lsh_pairs)):
+            precision, recall = _score(found, _pairs(labels))
+            print(f"{title + ' vs truth':<19} | precision {precision:.3f} | recall {recall:.3f}")
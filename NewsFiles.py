@@ -0,0 +1,11 @@
+import os
+
+
+def atomic_write(path, content):
+    # write next to the file and swap it in, a reader (or a crash) never sees half a file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as fw:
+        fw.write(content)
+        fw.flush()
+        os.fsync(fw.fileno())
+    os.replace(temp_path, path)
@@ -0,0 +1,73 @@
+import os
+import json
+from threading import Lock
+from NewsFiles import atomic_write
+
+
+class NewsJournal:
+
+    def __init__(self, path):
+        # one json document per line, new items are appended at the end of the file
+        self.path = path
+        self.appended_count = 0
+        self._checked_tail = False
+        self._lock = Lock()
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def load(self):
+        # stream the journal one line at a time, a line that was cut off by a crash is skipped
+        if not self.exists():
+            return
+
+        with open(self.path, "r", encoding="utf-8") as fr:
+            for line in fr:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def append(self, news_items):
+        lines = "".join(json.dumps(news_item, ensure_ascii=False) + "\n"
+                        for news_item in news_items)
+        if not lines:
+            return
+
+        with self._lock:
+            # a crash may have left a partial last line, start on a new line so we don't extend it
+            if not self._checked_tail:
+                lines = self._tail_separator() + lines
+                self._checked_tail = True
+
+            with open(self.path, "a", encoding="utf-8") as fa:
+                fa.write(lines)
+                fa.flush()
+                os.fsync(fa.fileno())
+
+            self.appended_count += len(news_items)
+
+    def compact(self, news_items):
+        # rewrite the journal with the current items only, the old file is replaced atomically
+        with self._lock:
+            atomic_write(self.path, "".join(json.dumps(news_item, ensure_ascii=False) + "\n"
+                                             for news_item in news_items))
+            self.appended_count = 0
+            self._checked_tail = True
+
+    def export_json(self, path, news_items):
+        # the pretty printed json file we used to rewrite on every change
+        atomic_write(path, json.dumps({"news": list(news_items)}, indent=4,
+                                       sort_keys=True, ensure_ascii=False))
+
+    def _tail_separator(self):
+        if not self.exists() or os.path.getsize(self.path) == 0:
+            return ""
+
+        with open(self.path, "rb") as fr:
+            fr.seek(-1, os.SEEK_END)
+            return "" if fr.read(1) == b"\n" else "\n"
+
@@ -0,0 +1,249 @@
+import json
+import time
+import queue
+import atexit
+import logging
+import linecache
+from itertools import islice
+from threading import Lock
+from logging.handlers import QueueHandler, QueueListener
+from decouple import config
+from NewsMetrics import metrics
+
+
+# fields displayException adds to the records of errors, besides the message
+ERROR_FIELDS = ("source", "error", "error_message", "file", "path", "line")
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    # the caller only puts the record in the queue, a full queue drops it instead of waiting for the writer
+
+    def prepare(self, record):
+        # only this handler sees the record (no propagation) and the writer formats it, nothing to do here
+        if record.args:
+            record.msg, record.args = record.getMessage(), None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment("log_records_dropped_total")
+
+
+class NewsLogListener(QueueListener):
+
+    def enqueue_sentinel(self):
+        # unlike the records, the stop signal waits for room in a full queue
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        # stopped by the owner and again at exit
+        if self._thread is not None:
+            super().stop()
+
+
+class RepeatFilter(logging.Filter):
+    # the same message is written once per window, the next one tells how many times it was repeated
+
+    def __init__(self, window=None, limit=1000):
+        super().__init__()
+        self.window = window if window is not None else config(
+            "LOG_REPEAT_WINDOW", default=300, cast=float)
+        # (level, message) -> [time.monotonic() when it was last written, repeats since then],
+        # least recently seen first
+        self.seen = {}
+        self.limit = limit
+        self._lock = Lock()
+
+    def filter(self, record):
+        record.repeated = self.allow(record.levelno, record.getMessage())
+        return record.repeated is not None
+
+    def allow(self, level, message):
+        # None when the message was written less than window seconds ago,
+        # otherwise the number of times it was repeated since it was last written
+        if self.window <= 0:
+            return 0
+
+        key = (level, message)
+        now = time.monotonic()
+        with self._lock:
+            seen = self.seen.pop(key, None)
+            if seen is not None and now - seen[0] < self.window:
+                seen[1] += 1
+                self.seen[key] = seen
+                metrics.increment("log_records_suppressed_total")
+                return None
+
+            self.seen[key] = [now, 0]
+
+            # error texts often carry ids and urls, forget the messages that weren't seen for a while,
+            # and the least recently seen half when there are still too many
+            if len(self.seen) > self.limit:
+                self.seen = {seen_key: value for seen_key, value in self.seen.items()
+                             if now - value[0] < self.window}
+                if len(self.seen) > self.limit // 2:
+                    self.seen = dict(islice(self.seen.items(), len(self.seen) - self.limit // 2, None))
+        return seen[1] if seen is not None else 0
+
+
+class NewsLog:
+    # what displayException writes with. a repeated message is dropped before any record is made,
+    # the others are queued without looking up the caller (the error carries its own file and line)
+
+    def __init__(self, logger, handler, repeat_filter):
+        self.logger = logger
+        self.handler = handler
+        self.repeat_filter = repeat_filter
+
+    def write(self, level, message, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+
+        repeated = self.repeat_filter.allow(level, message)
+        if repeated is None:
+            return
+
+        record = self.logger.makeRecord(self.logger.name, level, "", 0, message, None, None, extra=fields)
+        record.repeated = repeated
+        self.handler.enqueue(record)
+
+
+class NewsLogFormatter(logging.Formatter):
+    # runs on the writer thread, the source line of an error is looked up here and not by the scraper
+
+    def __init__(self, structured=False):
+        super().__init__("%(asctime)s | %(levelname)s | %(message)s", "%m-%d-%Y %I:%M:%S %p")
+        self.structured = structured
+
+    def format(self, record):
+        target = ""
+        if getattr(record, "path", None):
+            linecache.checkcache(record.path)
+            target = linecache.getline(record.path, record.line).strip()
+
+        if self.structured:
+            # one json object per line
+            entry = {
+                "time": self.formatTime(record, self.datefmt),
+                "level": record.levelname,
+                "thread": record.threadName,
+                "message": record.getMessage()
+            }
+            entry.update((field, getattr(record, field)) for field in ERROR_FIELDS
+                         if getattr(record, field, None) not in (None, ""))
+            if target:
+                entry["target"] = target
+            if getattr(record, "repeated", 0):
+                entry["repeated"] = record.repeated
+            return json.dumps(entry, ensure_ascii=False)
+
+        message = record.getMessage()
+        if getattr(record, "error", None):
+            message = f"{message}\n{'File:'.ljust(9)}{record.file}\n{'Target:'.ljust(9)}{target}\n{'Message:'.ljust(9)}{record.error_message}\n{'Line:'.ljust(9)}{record.line}\n"
+            message += ("-" * (len(str(record.error_message)) + 10))
+        if getattr(record, "repeated", 0):
+            message += f" (repeated {record.repeated} times)"
+
+        record.message = message
+        record.asctime = self.formatTime(record, self.datefmt)
+        return self.formatMessage(record)
+
+
+def start_logging(name, log_file=None, file_handler=None):
+    # records of the logger go through a queue to a writer thread, so logging never waits for the disk
+    logger = logging.getLogger(name)
+    logger.setLevel(config("LOG_LEVEL", default="DEBUG").upper())
+    logger.propagate = False
+
+    if file_handler is None:
+        file_handler = logging.FileHandler(
+            log_file or config("LOG_FILE", default="NewsScraper.log"), mode="a", delay=True)
+        file_handler.setFormatter(NewsLogFormatter(
+            structured=config("LOG_FORMAT", default="text").lower() == "json"))
+
+    # repeats are dropped on the caller's side, before they cost the writer anything
+    repeat_filter = RepeatFilter()
+    log_queue = queue.Queue(config("LOG_QUEUE_SIZE", default=10000, cast=int))
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(repeat_filter)
+    logger.addHandler(queue_handler)
+
+    listener = NewsLogListener(log_queue, file_handler)
+    listener.start()
+    # write what's left in the queue before the interpreter exits
+    atexit.register(listener.stop)
+    return NewsLog(logger, queue_handler, repeat_filter), listener
+
+
+metrics.describe("log_records_dropped_total", "Log records dropped because the log queue was full.")
+metrics.describe("log_records_suppressed_total", "Repeated log records not written.")
+
+
+if __name__ == "__main__":
+    # time added to the caller per logged error: writing to the file on the caller's thread (what
+    # displayException did before) against queueing it for the writer thread. a source that is down
+    # logs the same error every poll (repeated), distinct errors are all written. the slow target
+    # is a file handler that takes 1 ms per write, like a busy disk, a network share or a console
+    import os
+    import sys
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+
+    def _error_fields():
+        try:
+            raise ConnectionError("Max retries exceeded with url: /latest")
+        except ConnectionError:
+            _, message, tb = sys.exc_info()
+            return {"source": "CNN Philippines", "error": type(message).__name__, "error_message": str(message),
+                    "file": os.path.basename(tb.tb_frame.f_code.co_filename),
+                    "path": tb.tb_frame.f_code.co_filename, "line": tb.tb_lineno}
+
+    class SlowFileHandler(logging.FileHandler):
+
+        def emit(self, record):
+            time.sleep(0.001)
+            super().emit(record)
+
+    fields = _error_fields()
+    print(f"{'target':<7} {'messages':<9} {'direct us':>10} {'queued us':>10} {'dropped':>8}")
+
+    for target, handler_class, samples in (("fast", logging.FileHandler, 20000), ("slow", SlowFileHandler, 2000)):
+        for messages in ("repeated", "distinct"):
+            titles = [f"Error occurred while polling CNN Philippines. {idx if messages == 'distinct' else ''}"
+                      for idx in range(samples)]
+            results = []
+            dropped = metrics.value("log_records_dropped_total")
+
+            for path in ("direct", "queued"):
+                name = f"{target}-{messages}-{path}"
+                handler = handler_class(os.path.join(directory, f"{name}.log"), delay=True)
+                handler.setFormatter(NewsLogFormatter())
+
+                if path == "direct":
+                    direct_logger = logging.getLogger(name)
+                    direct_logger.setLevel(logging.DEBUG)
+                    direct_logger.propagate = False
+                    direct_logger.addHandler(handler)
+
+                    def _write(title):
+                        direct_logger.warning(title, extra=fields)
+                else:
+                    news_log, listener = start_logging(name, file_handler=handler)
+
+                    def _write(title):
+                        news_log.write(logging.WARNING, title, **fields)
+
+                start = time.perf_counter()
+                for title in titles:
+                    _write(title)
+                results.append((time.perf_counter() - start) / samples * 1e6)
+
+                if path == "queued":
+                    listener.stop()
+
+            dropped = metrics.value("log_records_dropped_total") - dropped
+            print(f"{target:<7} {messages:<9} {results[0]:>10.2f} {results[1]:>10.2f} {dropped:>8}")
@@ -0,0 +1,168 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from decouple import config
+from NewsFiles import atomic_write
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Metrics:
+
+    def __init__(self, window=None):
+        # latest samples kept per series for the percentiles, older ones roll off
+        self.window = window if window is not None else config(
+            "METRICS_WINDOW", default=500, cast=int)
+        # (name, labels) -> value
+        self.counters = {}
+        self.gauges = {}
+        # (name, labels) -> [recent samples, sum, count]
+        self.summaries = {}
+        self.help = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self.summaries.get(key)
+            if summary is None:
+                summary = self.summaries[key] = [deque(maxlen=self.window), 0.0, 0]
+            summary[0].append(value)
+            summary[1] += value
+            summary[2] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @property
+    def current_source(self):
+        # name of the news source the calling thread is running, "" outside of a source
+        return getattr(self._local, "source", "")
+
+    @contextmanager
+    def source_context(self, source):
+        # fetches and errors of this thread are counted for the source until it returns
+        previous_source = self.current_source
+        self._local.source = source
+        try:
+            yield
+        finally:
+            self._local.source = previous_source
+
+    def quantiles(self, name, **labels):
+        with self._lock:
+            summary = self.summaries.get((name, tuple(sorted(labels.items()))))
+            samples = sorted(summary[0]) if summary else []
+        return tuple(percentile(samples, fraction) for fraction in (0.5, 0.95, 0.99))
+
+    def value(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        return self.counters.get(key, self.gauges.get(key, 0))
+
+    def series(self, name):
+        # labels of every series recorded under name
+        with self._lock:
+            keys = list(self.counters) + list(self.gauges) + list(self.summaries)
+        return sorted({labels for key_name, labels in keys if key_name == name})
+
+    def prometheus_text(self):
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            summaries = sorted((key, (sorted(samples), total, count))
+                               for key, (samples, total, count) in self.summaries.items())
+
+        lines = []
+        described = set()
+
+        def _header(name, metric_type):
+            if name not in described:
+                described.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+        def _labels(labels, extra=()):
+            labels = list(labels) + list(extra)
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{label}="{escape_label(value)}"' for label, value in labels) + "}"
+
+        for (name, labels), value in counters:
+            _header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for (name, labels), value in gauges:
+            _header(name, "gauge")
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for (name, labels), (samples, total, count) in summaries:
+            _header(name, "summary")
+            for fraction in (0.5, 0.95, 0.99):
+                lines.append(
+                    f"{name}{_labels(labels, [('quantile', fraction)])} {percentile(samples, fraction):.6f}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        # replaced atomically, so a scraper (node exporter, cron) never reads half a file
+        atomic_write(path, self.prometheus_text())
+
+
+# every fetch, parse and scrape of the ticker is recorded here
+metrics = Metrics()
+metrics.describe("news_fetch_seconds", "Time to download a page or feed.")
+metrics.describe("news_fetch_bytes_total", "Bytes downloaded.")
+metrics.describe("news_fetch_responses_total", "Responses by HTTP status, 304 when the page didn't change.")
+metrics.describe("news_parse_seconds", "Time to parse a downloaded page or feed.")
+metrics.describe("news_source_seconds", "Time to poll a news source, fetch and parse included.")
+metrics.describe("news_source_items_total", "News items produced by a source.")
+metrics.describe("news_source_deduped_total", "News items of a source we already had.")
+metrics.describe("news_source_errors_total", "Errors while polling a source.")
+metrics.describe("news_store_items", "News items in the store.")
+metrics.describe("ticker_frame_seconds", "Time to draw one ticker frame.")
+
+
+if __name__ == "__main__":
+    # overhead of recording a sample, compared to the fetches it measures (tens of milliseconds)
+    samples = 100000
+    benchmark_metrics = Metrics()
+
+    start = time.perf_counter()
+    for idx in range(samples):
+        benchmark_metrics.observe("news_source_seconds", idx / samples, source=f"source{idx % 20}")
+    elapsed = time.perf_counter() - start
+    print(f"observe | {elapsed / samples * 1e6:.2f} us/sample")
+
+    start = time.perf_counter()
+    text = benchmark_metrics.prometheus_text()
+    print(f"prometheus text | {(time.perf_counter() - start) * 1000:.2f} ms | {len(text.splitlines())} lines")
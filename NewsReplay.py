@@ -0,0 +1,192 @@
+import os
+import re
+import json
+import tempfile
+from datetime import datetime as dt, timezone
+from threading import Lock
+from HttpSession import shared_session
+from NewsFiles import atomic_write
+from TwitterClient import TwitterClient, RecordedTwitterApi
+
+
+TWEET_TIME_FORMAT = "%a %b %d %H:%M:%S +0000 %Y"
+# text of the size of a headline or a story (five words or more), times like "about 5 mins ago" are shorter
+HEADLINE_TEXT_PATTERN = re.compile(rb">(\s*[^<\s]+(?:\s+[^<\s]+){4,}\s*)<")
+RSS_TEXT_PATTERN = re.compile(rb"(<(title|guid)(?:\s[^>]*)?>)(.*?)(</\2>)", re.DOTALL)
+
+
+class FixtureResponse:
+    # the parts of requests.Response that NewsParser, feedparser and FunHoliday read
+
+    def __init__(self, url, status_code=200, headers=None, content=b"", encoding=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+        self.encoding = encoding
+        self.not_modified = False
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class FixtureRecorder:
+    # raw responses of a real cycle, one body file per url plus an index.json with status and headers
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_file = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+
+        self.index = {}
+        if os.path.isfile(self.index_file):
+            with open(self.index_file, "r", encoding="utf-8") as fr:
+                self.index = json.load(fr)
+        self._lock = Lock()
+
+    def record(self, url, response):
+        with self._lock:
+            fixture = self.index.get(url)
+            body_file = fixture["file"] if fixture else f"{len(self.index):04d}.body"
+
+            with open(os.path.join(self.directory, body_file), "wb") as fw:
+                fw.write(response.content)
+
+            self.index[url] = {
+                "file": body_file,
+                "url": response.url,
+                "status": response.status_code,
+                "headers": {name: value for name, value in response.headers.items()
+                            if name.lower() in ("content-type", "etag", "last-modified")},
+                "encoding": response.encoding
+            }
+
+            atomic_write(self.index_file, json.dumps(self.index, indent=4, sort_keys=True))
+
+
+class FixtureSession:
+    # serves recorded responses in place of the network,
+    # "url#n" is the n-th copy of the page with every headline made unique (used to scale the data volume)
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "index.json"), "r", encoding="utf-8") as fr:
+            self.index = json.load(fr)
+        # (url, copy) -> body, the copies are built once so replaying them costs no more than the original
+        self.bodies = {}
+        self._lock = Lock()
+
+    def get(self, url, **kwargs):
+        base_url, _, copy = url.partition("#")
+        fixture = self.index.get(base_url)
+        if fixture is None:
+            return FixtureResponse(url, 404)
+
+        with self._lock:
+            body = self.bodies.get((base_url, copy))
+            if body is None:
+                with open(os.path.join(self.directory, fixture["file"]), "rb") as fr:
+                    body = fr.read()
+                if copy:
+                    body = copy_page(body, copy)
+                self.bodies[(base_url, copy)] = body
+
+        return FixtureResponse(fixture["url"], fixture["status"], dict(fixture["headers"]),
+                               body, fixture.get("encoding"))
+
+
+def copy_page(body, copy):
+    suffix = f" ({copy})".encode()
+
+    if body.lstrip()[:5] in (b"<?xml", b"<rss ", b"<rss>", b"<feed"):
+        # titles and guids of every feed entry
+        return RSS_TEXT_PATTERN.sub(lambda match: match.group(1) + match.group(3).rstrip() + suffix + match.group(4), body)
+
+    return HEADLINE_TEXT_PATTERN.sub(lambda match: b">" + match.group(1).rstrip() + suffix + b"<", body)
+
+
+def copy_tweets(recording, scale):
+    # "account_n" is the n-th copy of the account's timeline, with its own tweet ids and texts.
+    # tweets are moved in time as if the latest one was just posted, older days are filtered out otherwise
+    created_at = [dt.strptime(tweet["created_at"], TWEET_TIME_FORMAT)
+                  for timelines in recording.values() for tweets in timelines.values() for tweet in tweets]
+    shift = dt.now(timezone.utc).replace(tzinfo=None) - max(created_at) if created_at else None
+
+    def _copy(tweet, copy):
+        tweet = dict(tweet, created_at=(dt.strptime(tweet["created_at"], TWEET_TIME_FORMAT) + shift).strftime(TWEET_TIME_FORMAT))
+        if copy:
+            tweet.update(id=tweet["id"] + copy * 10 ** 15, full_text=f"{tweet.get('full_text', '')} ({copy})")
+        return tweet
+
+    scaled = {}
+    for endpoint, timelines in recording.items():
+        scaled[endpoint] = {}
+        for copy in range(scale):
+            for key, tweets in timelines.items():
+                scaled[endpoint][f"{key}_{copy}" if copy else key] = [_copy(tweet, copy) for tweet in tweets]
+    return scaled
+
+
+def copy_news_sources(news_sources, scale):
+    # every source (except custom ones) is polled scale times, each copy reads its own copy of the data
+    scaled = list(news_sources)
+    for copy in range(1, scale):
+        for news_source in news_sources:
+            if news_source["type"] == "custom":
+                continue
+
+            news_source = dict(news_source, name=f"{news_source['name']} #{copy}")
+            if news_source.get("url"):
+                news_source["url"] = f"{news_source['url']}#{copy}"
+            if news_source.get("accounts"):
+                news_source["accounts"] = [f"{account}_{copy}" for account in news_source["accounts"]]
+            if news_source.get("list"):
+                news_source["list"] = f"{news_source['list']}_{copy}"
+            scaled.append(news_source)
+    return scaled
+
+
+def record(ticker, directory):
+    # the next cycles of the ticker save what they download into directory
+    shared_session.recorder = FixtureRecorder(directory)
+    ticker.twitter = TwitterClient(
+        cursor_file="", record_file=os.path.join(directory, "tweets.json"))
+
+
+def replay(ticker, directory, scale=1):
+    # the ticker reads the fixtures in directory instead of the network, scale times the recorded data
+    shared_session.stand_in = FixtureSession(directory)
+    ticker.news_sources = copy_news_sources(ticker.news_sources, scale)
+
+    tweets_file = os.path.join(directory, "tweets.json")
+    recording = {}
+    if os.path.isfile(tweets_file):
+        with open(tweets_file, "r", encoding="utf-8") as fr:
+            recording = json.load(fr)
+
+    scaled_tweets_file = os.path.join(tempfile.mkdtemp(), "tweets.json")
+    with open(scaled_tweets_file, "w", encoding="utf-8") as fw:
+        json.dump(copy_tweets(recording, scale), fw)
+    ticker.twitter = TwitterClient(RecordedTwitterApi(scaled_tweets_file), cursor_file="", record_file="")
+
+
+if __name__ == "__main__":
+    # record the fixtures of one real fetch cycle: python NewsReplay.py <fixtures directory>
+    import sys
+    from NewsScraper import NewsTicker
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else "fixtures"
+    ticker = NewsTicker()
+    # a fresh store and no validators, so every page is downloaded in full
+    ticker.open_news_file(os.path.join(tempfile.mkdtemp(), "News.json"))
+    record(ticker, directory)
+    ticker.scrape_breaking_news()
+    ticker.scrape_latest_news()
+
+    print(f"Recorded {len(shared_session.recorder.index)} responses and "
+          f"{len(ticker.twitter.cursors)} twitter timelines into {directory}")
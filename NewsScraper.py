@@ -1,136 +1,155 @@
-import datetime
 import os
 import re
 import sys
-import requests
 import json
+import glob
 import feedparser
 import logging
-import linecache
+import io
+import xml.etree.ElementTree as ET
+from html import unescape
+from urllib.parse import urljoin
 from datetime import timedelta, datetime as dt
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from colorama import init
-from threading import Event, Thread
+from threading import BoundedSemaphore, Event, Lock, Thread
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty
 import time
-import tweepy
-from dateutil import tz
+import random
+from functools import lru_cache
 from decouple import config
+from NewsStore import NewsStore
+from NewsText import has_url
+from NewsJournal import NewsJournal
+from NewsArchive import NewsArchive
+from TerminalRenderer import TerminalRenderer
+from HttpSession import shared_session
+from NewsMetrics import metrics
+from NewsLogging import start_logging
+from NewsSources import load_news_sources
+from TwitterClient import TwitterClient
 
 
-logger = logging.getLogger(__name__)
-# logger.setLevel(logging.INFO)
+# lxml builds the tree much faster when it's installed, html.parser is the fallback
+try:
+    import lxml
+    HTML_PARSER = config("HTML_PARSER", default="lxml")
+except ImportError:
+    HTML_PARSER = config("HTML_PARSER", default="html.parser")
 
-formatter = logging.Formatter(
-    "%(asctime)s | %(levelname)s | %(message)s", "%m-%d-%Y %I:%M:%S %p")
 
-file_handler = logging.FileHandler("NewsScraper.log", mode="a")
-file_handler.setFormatter(formatter)
+# written by a background thread, repeated messages once per LOG_REPEAT_WINDOW
+news_log, log_listener = start_logging(__name__)
 
-logger.addHandler(file_handler)
 
+def displayException(exception_title="", ex_type=logging.INFO, count_error=False):
+    # the record keeps the error as fields, the writer thread formats them (and reads the source line).
+    # count_error is for the failures a source catches itself and carries on from
+    fields = {"source": metrics.current_source}
 
-def displayException(exception_title="", ex_type=logging.INFO):
-    log_data = ""
+    if count_error and metrics.current_source:
+        metrics.increment("news_source_errors_total", source=metrics.current_source)
 
-    logger.setLevel(ex_type)
     if ex_type == logging.ERROR or ex_type == logging.CRITICAL:
         (_, message, tb) = sys.exc_info()
 
-        f = tb.tb_frame
-        lineno = tb.tb_lineno
-        fname = f.f_code.co_filename.split("\\")[-1]
-        linecache.checkcache(fname)
-        target = linecache.getline(fname, lineno, f.f_globals)
+        if tb is not None:
+            # the innermost frame, where the error was raised
+            while tb.tb_next is not None:
+                tb = tb.tb_next
+            path = tb.tb_frame.f_code.co_filename
+            fields.update(error=type(message).__name__, error_message=str(message),
+                          file=path.replace("\\", "/").split("/")[-1], path=path, line=tb.tb_lineno)
 
-        line_len = len(str(message)) + 10
-        log_data = f"{exception_title}\n{'File:'.ljust(9)}{fname}\n{'Target:'.ljust(9)}{target.strip()}\n{'Message:'.ljust(9)}{message}\n{'Line:'.ljust(9)}{lineno}\n"
-        log_data += ("-" * line_len)
+    news_log.write(ex_type, exception_title, **fields)
 
-    else:
-        log_data = exception_title
+    if ex_type == logging.ERROR or ex_type == logging.CRITICAL:
+        raise Exception(exception_title)
 
-    if ex_type == logging.DEBUG:
-        logger.debug(log_data)
 
-    elif ex_type == logging.INFO:
-        logger.info(log_data)
+TIME_FORMAT = "%A, %d %b %Y %I:%M %p"
 
-    elif ex_type == logging.WARNING:
-        logger.warning(log_data)
 
-    elif ex_type == logging.ERROR:
-        logger.error(log_data)
-        raise Exception(exception_title)
+def parse_time(date_time):
+    # news time is parsed once when it's ingested, everything after that works with datetime objects
+    if date_time is None or date_time == "":
+        return dt.now()
+    if isinstance(date_time, dt):
+        return date_time
+    return dt.strptime(date_time, TIME_FORMAT)
 
-    elif ex_type == logging.CRITICAL:
-        logger.critical(log_data)
-        raise Exception(exception_title)
 
+def format_time(date_time):
+    # only used at the edges (json file and display)
+    return date_time.strftime(TIME_FORMAT) if isinstance(date_time, dt) else date_time
 
-def convert_time_stamp_to_datetime(time_stamp):
-    current_date_time = dt.now()
 
-    try:
-        if "about Just now" in time_stamp:
-            return current_date_time.strftime("%A, %d %b %Y %I:%M %p")
+# CNN Philippines writes the news time as "about 5 mins ago", "about an hour ago", "about 2 days ago" or "about Just now"
+RELATIVE_TIME_PATTERN = re.compile(r"\b(\d+|an?)\s*(min|hour|day)", re.IGNORECASE)
+# the time of a CNN Philippines article page, e.g. "Oct 18, 2020 4:05:00 PM"
+ARTICLE_TIME_FORMAT = "%b %d, %Y %I:%M:%S %p"
+RELATIVE_TIME_UNITS = {"min": "minutes", "hour": "hours", "day": "days"}
+# "0 hours ago" is still within the hour, "0 days ago" is still within the day
+ZERO_RELATIVE_TIME = {"min": timedelta(0), "hour": timedelta(minutes=59),
+                      "day": timedelta(hours=23, minutes=59)}
 
-        year = current_date_time.year
-        month = current_date_time.month
-        day = current_date_time.day
-        hour = current_date_time.hour
-        minute = current_date_time.minute
 
-        extract_numeric_value = [
-            number for number in time_stamp.split(" ") if number.isdigit()]
+def convert_time_stamp_to_datetime(time_stamp, now=None):
+    current_date_time = now if now is not None else dt.now()
 
-        if len(extract_numeric_value) > 0:
-            value = int(extract_numeric_value[0])
-        else:
-            value = 0
+    try:
+        if "Just now" in time_stamp:
+            return current_date_time
 
-        if "mins" in time_stamp:
-            if value <= 0:
-                return current_date_time.strftime("%A, %d %b %Y %I:%M %p")
-            else:
-                return (current_date_time - timedelta(minutes=value)).strftime("%A, %d %b %Y %I:%M %p")
-        elif "hour" in time_stamp:
-            if value <= 0:
-                return (current_date_time - timedelta(minutes=59)).strftime("%A, %d %b %Y %I:%M %p")
-            else:
-                return (current_date_time - timedelta(hours=value)).strftime("%A, %d %b %Y %I:%M %p")
-        else:  # day
-            if value <= 0 or (day - value) <= 0:
-                return (current_date_time - timedelta(hours=23, minutes=59)).strftime("%A, %d %b %Y %I:%M %p")
-            else:
-                return dt(year, month, (day - value), hour, minute).strftime("%A, %d %b %Y %I:%M %p")
+        match = RELATIVE_TIME_PATTERN.search(time_stamp)
+        if match is None:
+            try:
+                return dt.strptime(time_stamp.strip(), ARTICLE_TIME_FORMAT)
+            except ValueError:
+                # unknown format, assume it's from earlier today
+                return current_date_time - timedelta(hours=23, minutes=59)
+
+        # "a min ago", "an hour ago", "a day ago"
+        value = int(match.group(1)) if match.group(1).isdigit() else 1
+        unit = match.group(2).lower()
+
+        if value <= 0:
+            return current_date_time - ZERO_RELATIVE_TIME[unit]
+        return current_date_time - timedelta(**{RELATIVE_TIME_UNITS[unit]: value})
 
     except Exception:
         pass
         displayException("Time stamp to date/time conversion error.")
-        return current_date_time.strftime("%A, %d %b %Y %I:%M %p")
+        return current_date_time
+
 
+@lru_cache(maxsize=4096)
+def relative_time_stamp(minutes):
+    # every item posted the same number of minutes ago reads the same, so each label is built once
+    days, minutes_of_day = divmod(minutes, 24 * 60)
+    hours = minutes_of_day // 60
 
-def convert_datetime_to_time_stamp(date_time):
+    if days > 0:
+        return f"about {days} day{'s' if days > 1 else ''} ago"
+    elif hours > 0:
+        return f"about {hours} hour{'s' if hours > 1 else ''} ago"
+    elif minutes > 0:
+        return f"about {minutes} min{'s' if minutes > 1 else ''} ago"
+    else:
+        return "about Just now"
+
+
+def convert_datetime_to_time_stamp(date_time, now=None):
+    # pass the same "now" for every item of a pass, instead of reading the clock for each one
     try:
-        current_date_time = dt.now()
+        current_date_time = now if now is not None else dt.now()
         if date_time == None:
             date_time = current_date_time
 
-        parsed_date_time = dt.strptime(date_time, "%A, %d %b %Y %I:%M %p")
-        time_diff = (current_date_time - parsed_date_time)
-
-        sec_diff = time_diff.seconds
-        min_diff = sec_diff // 60
-        hour_diff = min_diff // 60
-
-        if time_diff.days > 0:
-            return f"about {time_diff.days} day{'s' if time_diff.days > 1 else ''} ago"
-        elif hour_diff > 0:
-            return f"about {hour_diff} hour{'s' if hour_diff > 1 else ''} ago"
-        elif min_diff > 0:
-            return f"about {min_diff} min{'s' if min_diff > 1 else ''} ago"
-        else:
-            return "about Just now"
+        # items from the future (clock skew) are "Just now"
+        elapsed = current_date_time - parse_time(date_time)
+        return relative_time_stamp(max(int(elapsed.total_seconds() // 60), 0))
 
     except Exception:
         pass
@@ -138,80 +157,218 @@ def convert_datetime_to_time_stamp(date_time):
         return "about a moment ago"
 
 
-def has_url(text):
-    url_pattern = re.compile(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+')
-    return url_pattern.search(text) is not None
+def news_mapper(news_data):
+    # map a scraped (or json) news dictionary into a News record
+    try:
+        time_stamp = parse_time(news_data.get("time"))
+    except Exception:
+        time_stamp = dt.now()
 
+    return News(
+        breaking=str(news_data.get("breaking_news", "false")).lower() == "true",
+        headline=(news_data.get("headline") or "").replace('\"', "").replace("`", ""),
+        time_stamp=time_stamp,
+        source=news_data.get("source") or "",
+        source_url=news_data.get("source url") or "",
+        story=(news_data.get("story") or "").replace('\"', "").replace("`", "")
+    )
 
-def news_mapper(news_data):
-    news = News()
 
-    try:
-        news.breaking = news_data["breaking_news"]
-    except:
-        news.breaking = "false"
+TAG_PATTERN = re.compile(r"<[^>]+>")
 
-    try:
-        headline = news_data["headline"].replace('\"', "").replace("`", "")
-        # headline = headline if has_url(
-        #     headline) else f"{headline} {news_data['source url']}"
 
-        news.headline = headline
-    except:
-        pass
+def strip_tags(html):
+    # feed fields only carry simple markup, a full soup per field is not needed
+    return unescape(TAG_PATTERN.sub("", html))
 
-    datetime_now = dt.now().strftime("%A, %d %b %Y %I:%M %p")
-    try:
-        news.time_stamp = news_data["time"] if news_data["time"] else datetime_now
-    except:
-        pass
-        news.time_stamp = datetime_now
 
-    try:
-        news.source = news_data["source"]
-    except:
-        pass
+def iter_feed_items(content):
+    # stream <item> elements of an RSS 2.0 feed, each one is dropped as soon as it has been read
+    for _, elem in ET.iterparse(io.BytesIO(content), events=("end",)):
+        if elem.tag != "item":
+            continue
 
-    try:
-        news.source_url = news_data["source url"]
-    except:
-        pass
+        link = elem.findtext("link", "")
+        yield {
+            "guid": elem.findtext("guid") or link,
+            "title": elem.findtext("title", ""),
+            "link": link,
+            "published": elem.findtext("pubDate", ""),
+            "description": elem.findtext("description", ""),
+            "source": elem.findtext("source", "")
+        }
+        elem.clear()
 
-    try:
-        news.story = news_data["story"].replace('\"', "").replace("`", "")
-    except:
-        pass
 
-    return news.serialize()
+# bounded pool shared by every scraping cycle
+source_pool = ThreadPoolExecutor(max_workers=config(
+    "SOURCE_WORKERS", default=8, cast=int), thread_name_prefix="NewsSource")
+# limits the number of timeline requests in flight to twitter
+twitter_slots = BoundedSemaphore(config(
+    "TWITTER_HOST_CONCURRENCY", default=4, cast=int))
 
 
-def is_match(voice_data, keywords):
-    lowercase_keywords = [keyword.lower().strip() for keyword in keywords]
+def source_name(source):
+    return getattr(source, "__name__", str(source))
 
-    if len(voice_data.split(" ")) > 1:
-        if voice_data.lower() in " ".join(lowercase_keywords):
-            return True
-    else:
-        if (any(map(lambda word: word == voice_data.lower(), lowercase_keywords))):
-            return True
-    return False
 
+def run_source(source):
+    # poll one news source, its time and errors are recorded under its name.
+    # the errors counted here are the ones that escape the source, the ones it catches
+    # are counted where they're caught (displayException(..., count_error=True))
+    name = source_name(source)
+    with metrics.source_context(name), metrics.timer("news_source_seconds", source=name):
+        try:
+            return source()
+        except Exception:
+            metrics.increment("news_source_errors_total", source=name)
+            raise
+
+
+def merge_source_result(source, merge, news_items):
+    # merge() returns the items that were actually added, the rest were duplicates
+    new_news = merge(news_items)
+
+    name = source_name(source)
+    metrics.increment("news_source_items_total", len(news_items), source=name)
+    if new_news is not None:
+        metrics.increment("news_source_deduped_total",
+                          len(news_items) - len(new_news), source=name)
+    return new_news
+
+
+def fetch_concurrently(sources, merge, deadline=None):
+    # run every source in parallel and hand each result to merge() as soon as it arrives.
+    # each source has deadline seconds from the moment a worker starts running it (not from when
+    # it was queued), a source that takes longer is merged whenever it finishes
+    if deadline is None:
+        deadline = config("SOURCE_DEADLINE", default=30, cast=float)
+
+    # (position of the source, time.monotonic() when it started) or (position, None) when it's done
+    events = Queue()
+
+    def _run_source(position, source):
+        events.put((position, time.monotonic()))
+        return run_source(source)
+
+    def _merge_late_result(future):
+        try:
+            merge_source_result(futures[future], merge, future.result())
+        except Exception as ex:
+            pass
+            displayException(f"Error occurred while merging late news source. {ex}")
+
+    futures = {}
+    submitted = []
+    for position, source in enumerate(sources):
+        future = source_pool.submit(_run_source, position, source)
+        futures[future] = source
+        submitted.append(future)
+        future.add_done_callback(lambda _, position=position: events.put((position, None)))
+
+    # sources we're still waiting for, and when the running ones run out of time
+    waiting = set(range(len(submitted)))
+    expires = {}
+    while waiting:
+        timeout = max(min(expires.values()) - time.monotonic(), 0) if expires else None
+        try:
+            position, started = events.get(timeout=timeout)
+        except Empty:
+            # don't wait for slow sources, their results will be merged once they finish
+            now = time.monotonic()
+            for position, expiry in list(expires.items()):
+                if expiry <= now:
+                    del expires[position]
+                    waiting.discard(position)
+                    displayException(
+                        f"{source_name(futures[submitted[position]])} took longer than {deadline} seconds.", logging.WARNING)
+                    submitted[position].add_done_callback(_merge_late_result)
+            continue
+
+        # a source we gave up on is merged by its callback, never here too
+        if position not in waiting:
+            continue
+        if started is not None:
+            expires[position] = started + deadline
+            continue
+
+        waiting.discard(position)
+        expires.pop(position, None)
+        future = submitted[position]
+        # a failing source doesn't cost us the results of the others
+        try:
+            merge_source_result(futures[future], merge, future.result())
+        except Exception as ex:
+            pass
+            displayException(
+                f"Error occurred while fetching {source_name(futures[future])}. {ex}", logging.WARNING)
 
-class News:
+
+class SourceScheduler:
 
     def __init__(self):
-        self.breaking = "false"
-        self.headline = ""
-        self.time_stamp = ""
-        self.source = ""
-        self.source_url = ""
-        self.story = ""
+        self.stop_event = Event()
+        self.sources = []
+        self.workers = []
+
+    def add_source(self, source, merge, interval, max_backoff=None):
+        # each source is polled by its own worker at its own interval
+        if max_backoff is None:
+            max_backoff = config("SOURCE_MAX_BACKOFF", default=4, cast=float)
+        self.sources.append((source, merge, interval, interval * max_backoff))
+
+    def start(self):
+        for source, merge, interval, max_interval in self.sources:
+            worker = Thread(target=self._poll, args=(source, merge, interval, max_interval),
+                            name=f"Scheduler {source_name(source)}", daemon=True)
+            self.workers.append(worker)
+            worker.start()
+
+    def stop(self, timeout=None):
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join(timeout)
+        self.workers = []
+
+    def _poll(self, source, merge, interval, max_interval):
+        delay = interval
+
+        # a worker runs its source one at a time, so polls of the same source never overlap
+        while not self.stop_event.wait(delay * random.uniform(0.8, 1.2)):
+            try:
+                has_news = len(merge_source_result(
+                    source, merge, run_source(source))) > 0
+            except Exception as ex:
+                has_news = False
+                displayException(
+                    f"Error occurred while polling {source_name(source)}. {ex}", logging.WARNING)
+
+            # back off while the source is failing or has nothing new
+            delay = interval if has_news else min(delay * 2, max_interval)
+
+
+class News:
+    __slots__ = ("breaking", "headline", "time_stamp",
+                 "source", "source_url", "story")
+
+    def __init__(self, breaking=False, headline="", time_stamp=None, source="", source_url="", story=""):
+        self.breaking = breaking
+        self.headline = headline
+        self.time_stamp = time_stamp
+        # the same few source names repeat on every item, keep a single copy of each
+        self.source = sys.intern(str(source))
+        self.source_url = source_url
+        self.story = story
+
+    def __repr__(self):
+        return f"News({self.headline!r}, {self.source!r}, {format_time(self.time_stamp)!r})"
 
     def serialize(self):
+        # json schema of the news file
         return {
-            "breaking_news": self.breaking,
+            "breaking_news": "true" if self.breaking else "false",
             "headline": self.headline,
-            "time": self.time_stamp,
+            "time": format_time(self.time_stamp),
             "source": self.source,
             "source url": self.source_url,
             "story": self.story
@@ -220,38 +377,159 @@ class News:
 
 class NewsParser():
 
+    # url -> (fetched_at, base_url, content, encoding, {selector: parsed elements}),
+    # shared by every parser within the same scraping cycle,
+    # content is None when the page didn't change since the last cycle
+    page_cache = {}
+    # sources polled by separate workers still share a page downloaded within this many seconds
+    page_cache_ttl = config("PAGE_CACHE_TTL", default=10, cast=float)
+    page_locks = {}
+    page_cache_lock = Lock()
+
     def __init__(self, url):
         self.url = url
         self.base_url = ""
         self.parsed_news = []
+        self.fetch_seconds = 0
+
+    def fetch(self):
+        # every download is measured for the news source that asked for it
+        source = metrics.current_source or self.url
+        start = time.perf_counter()
+        try:
+            response = shared_session.get(self.url)
+        except Exception:
+            metrics.increment("news_fetch_responses_total",
+                              source=source, status="error")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.fetch_seconds += elapsed
+            metrics.observe("news_fetch_seconds", elapsed, source=source)
+
+        metrics.increment("news_fetch_responses_total", source=source,
+                          status=304 if response.not_modified else response.status_code)
+        if not response.not_modified:
+            metrics.increment("news_fetch_bytes_total", len(
+                response.content), source=source)
+        return response
+
+    @classmethod
+    def new_cycle(cls):
+        # forget the pages downloaded on the previous cycle
+        with cls.page_cache_lock:
+            cls.page_cache = {}
+            cls.page_locks = {}
+
+    @classmethod
+    def drop_expired_pages(cls, now):
+        # the workers of the scheduler never start a new cycle, drop the pages nobody is reading
+        # that are too old to be reused (call with page_cache_lock held)
+        for url, page in list(cls.page_cache.items()):
+            if now - page[0] > cls.page_cache_ttl:
+                del cls.page_cache[url]
+        for url, page_lock in list(cls.page_locks.items()):
+            if url not in cls.page_cache and not page_lock.locked():
+                del cls.page_locks[url]
+
+    def load_page(self):
+        with NewsParser.page_cache_lock:
+            NewsParser.drop_expired_pages(time.time())
+            page_lock = NewsParser.page_locks.setdefault(self.url, Lock())
+
+        # only one download per url, other parsers of the same url wait for it
+        with page_lock:
+            page = NewsParser.page_cache.get(self.url)
+
+            if page is None or time.time() - page[0] > NewsParser.page_cache_ttl:
+                response = self.fetch()
+                base_url = os.path.dirname(response.url)
+                content = None
+                encoding = None
+
+                # page didn't change since the last cycle, nothing new to parse
+                if not response.not_modified:
+                    # keep the raw bytes, the parser decodes them itself
+                    content = response.content.replace(b"\n", b" ")
+                    # only trust the encoding when the server declared it, otherwise let the parser sniff it
+                    if "charset" in response.headers.get("Content-Type", "").lower():
+                        encoding = response.encoding
+
+                page = (time.time(), base_url, content, encoding, {})
+                with NewsParser.page_cache_lock:
+                    NewsParser.page_cache[self.url] = page
+
+        return page, page_lock
+
+    def select(self, *xpath):
+        page, page_lock = self.load_page()
+        _, self.base_url, content, encoding, parsed = page
+
+        if content is None:
+            return None
+
+        # build only the elements under the requested selector, once per selector for this cycle
+        with page_lock:
+            selector = repr(xpath)
+            if selector not in parsed:
+                with metrics.timer("news_parse_seconds", source=metrics.current_source or self.url):
+                    soup = BeautifulSoup(content, HTML_PARSER, parse_only=SoupStrainer(
+                        *xpath), from_encoding=encoding)
+                    parsed[selector] = soup.find_all(*xpath)
+
+            return parsed[selector]
 
     def clean(self, html):
-        soup = BeautifulSoup(html, "html.parser")
-        text = soup.get_text().replace("View Full coverage on Google News", "")
+        text = strip_tags(html).replace("View Full coverage on Google News", "")
         return text.strip()
 
-    def parse_feed(self):
+    def read_feed(self):
+        # conditional GET through the shared session, nothing to read when the feed didn't change
+        response = self.fetch()
+        if response.not_modified:
+            return
+
         try:
-            feeds = feedparser.parse(self.url).entries
+            yield from iter_feed_items(response.content)
+            return
+        except ET.ParseError:
+            pass
+
+        # not a plain RSS 2.0 document (atom, malformed xml), let feedparser deal with it,
+        # entries we already read before the error are skipped by their guid
+        yield from ({
+            "guid": feed.get("id") or feed.get("link", ""),
+            "title": feed.get("title", ""),
+            "link": feed.get("link", ""),
+            "published": feed.get("published", ""),
+            "description": feed.get("description", ""),
+            "source": feed.get("source", {}).get("title", "")
+        } for feed in feedparser.parse(response.content).entries)
+
+    def parse_feed(self, timezone_offset=0, breaking=False, seen_guids=None):
+        start = time.perf_counter()
+        try:
+            feeds = self.read_feed()
 
             for feed in feeds:
+                # skip what the consumer already ingested before doing any cleaning
+                if seen_guids is not None and not seen_guids.add(feed["guid"]):
+                    continue
+
                 # gmt_to_datetime = dt.strptime(
                 #     feed.get("published", ""), "%a, %d %b %Y %H:%M:%S %Z")
 
-                # localTime = gmt_to_datetime.strftime('%A, %d %b %Y %I:%M %p')
-
-                # +8 hours
-                created_at = dt.strptime(
-                    feed.get("published", ""), "%a, %d %b %Y %H:%M:%S %Z") + timedelta(hours=8)
-                localTime = created_at.strftime("%A, %d %b %Y %I:%M %p")
+                localTime = dt.strptime(
+                    feed["published"], "%a, %d %b %Y %H:%M:%S %Z") + timedelta(hours=timezone_offset)
 
-                source = feed.get("source", "").get("title", "")
-                headline = self.clean(feed.get("title", "")).replace(
+                source = feed["source"]
+                headline = self.clean(feed["title"]).replace(
                     f" - {source}", "")
-                source_url = feed.get("link", "")
-                story = self.clean(feed.get("description", ""))
+                source_url = feed["link"]
+                story = self.clean(feed["description"])
 
                 news_data = {
+                    "breaking_news": "true" if breaking else "false",
                     "headline": headline,
                     "time": localTime,
                     "source": source,
@@ -262,70 +540,207 @@ class NewsParser():
 
         except Exception as ex:
             pass
-            displayException(f"Error occurred while parsing rss feed. {ex}")
+            displayException(f"Error occurred while parsing rss feed. {ex}", count_error=True)
 
+        # the feed is read while it's parsed, leave the download out of the parse time
+        metrics.observe("news_parse_seconds", time.perf_counter() - start - self.fetch_seconds,
+                        source=metrics.current_source or self.url)
         return self.parsed_news
 
     def parse_html(self, *xpath):
         try:
-            response = requests.get(self.url)
-            self.base_url = os.path.dirname(response.url)
+            elements = self.select(*xpath)
 
-            cleaned_response = response.text.replace("\n", " ")
-            soup = BeautifulSoup(cleaned_response, "html.parser")
+            if elements is None:
+                return self.parsed_news
 
-            return soup.find_all(*xpath)
+            return elements
 
         except Exception as ex:
             pass
-            displayException(f"Error occurred while parsing html. {ex}")
+            displayException(f"Error occurred while parsing html. {ex}", count_error=True)
 
         return self.parsed_news
 
 
+class SeenGuids:
+    # guids of the feed entries a ticker already ingested, each ticker (and its store) has its own
+
+    def __init__(self, limit=None):
+        self.limit = limit if limit is not None else config(
+            "FEED_SEEN_GUIDS", default=10000, cast=int)
+        # guid -> None, oldest first, so the oldest are dropped first
+        self.guids = {}
+        self._lock = Lock()
+
+    def add(self, guid):
+        # False when the guid was already seen
+        with self._lock:
+            if guid in self.guids:
+                return False
+
+            self.guids[guid] = None
+            if len(self.guids) > self.limit:
+                del self.guids[next(iter(self.guids))]
+            return True
+
+
 class NewsTicker:
 
     def __init__(self):
-        self.news = []
+        self.news = NewsStore()
         self.breaking_news_update = []
         self.changed_news_count = 0
         self.news_file = ""
+        self.journal = None
+        # optional multi-day sqlite archive, enabled by setting NEWS_ARCHIVE to a database file
+        archive_file = config("NEWS_ARCHIVE", default="")
+        self.archive = NewsArchive(archive_file) if archive_file else None
+        self.news_file_override = ""
+        self.update_lock = Lock()
+        self.save_lock = Lock()
+        self.scheduler = None
+        # registered news sources, see NewsSources.py
+        self.news_sources = load_news_sources()
+        # one twitter client for the life of the ticker, it remembers the last tweet read from every account
+        self.twitter = TwitterClient()
+        # feed entries already merged into the store, so they're not parsed again on the next poll
+        self.seen_guids = SeenGuids()
+        self.renderer = None
+        self.window_height = ""
+        self.breaking_news_event = Event()
+        # breaking news stories that weren't casted yet
+        self.breaking_cursor = self.news.breaking_cursor()
+
+    def store_news(self, news_items):
+        # keep only the headlines we don't have yet, and journal them right away
+        with self.save_lock:
+            # background fetchers (latest and breaking) keep running past midnight,
+            # keep journaling into the right day's file
+            if self.journal is not None:
+                self.open_news_file(self.news_file_override)
+            new_news = self.news.extend(news_items)
+            metrics.set("news_store_items", len(self.news))
+
+            if new_news and self.journal is not None:
+                try:
+                    self.journal.append([news_item.serialize()
+                                        for news_item in new_news])
+
+                    # once in a while, rewrite the journal without stale entries and refresh the json export
+                    if self.journal.appended_count >= config("JOURNAL_COMPACT_EVERY", default=200, cast=int):
+                        self.compact_news()
+                except Exception as ex:
+                    pass
+                    displayException(f"Error occurred while saving news. {ex}")
+
+        if new_news and self.archive is not None:
+            try:
+                self.archive.add(new_news)
+            except Exception as ex:
+                pass
+                displayException(f"Error occurred while archiving news. {ex}")
+
+        if new_news:
+            self.publish_news_update("latest", new_news)
+
+        return new_news
+
+    def publish_news_update(self, update_type, news_items):
+        # the items are already in the store, consumers read them with their own cursor.
+        # breaking news wakes up the display right away
+        if update_type == "breaking":
+            self.breaking_news_event.set()
 
     def count_news(self):
         return len(self.news)
 
-    def get_news(self):
-        try:
-            distinct_news = []
-            for news_item in self.news:
-                # remove duplicates based on headlines
-                if self.is_within_day(news_item["time"]) and news_item["headline"].lower() not in [news["headline"].lower() for news in distinct_news]:
-                    distinct_news.append(news_item)
+    def today_range(self):
+        start_of_day = dt.combine(dt.now().date(), dt.min.time())
+        return start_of_day, start_of_day + timedelta(days=1)
+
+    def get_news(self, count=None, one_per_story=False):
+        # news store is already distinct by headline, and kept in "time" order (latest -> older).
+        # it reads the store's latest snapshot, so scrapers can keep adding news meanwhile
+        return self.news.top(count, *self.today_range(), one_per_story=one_per_story)
+
+    def run_breaking_news_daemon(self, include_latest_news=False):
+        # the daemon is already polling the news sources
+        if self.scheduler is not None:
+            return
+
+        self.scheduler = SourceScheduler()
+        for breaking in ((True, False) if include_latest_news else (True,)):
+            merge = self.merge_breaking_news if breaking else self.merge_latest_news
+            for source, interval in self.build_news_sources(breaking):
+                self.scheduler.add_source(source, merge, interval)
+
+        self.scheduler.start()
+
+        # write the metrics summary once per cycle, until the scheduler is stopped
+        stop_event = self.scheduler.stop_event
+        metrics_interval = config("METRICS_INTERVAL", default=60, cast=float)
+
+        def _report_metrics():
+            while not stop_event.wait(metrics_interval):
+                self.report_metrics()
 
-            # sort news by "time" (descending order - latest -> older)
-            date_time_now = dt.now().strftime("%A, %d %b %Y %I:%M %p")
-            return sorted(distinct_news, key=lambda feed: dt.strptime(date_time_now if feed["time"] == None else feed["time"], "%A, %d %b %Y %I:%M %p"), reverse=True)
+        Thread(target=_report_metrics, name="Metrics", daemon=True).start()
+
+    def run_news_daemon(self):
+        # poll every breaking and latest news source in the background
+        self.run_breaking_news_daemon(include_latest_news=True)
+
+    def stop_breaking_news_daemon(self, timeout=None):
+        if self.scheduler is not None:
+            self.scheduler.stop(timeout)
+            self.scheduler = None
+
+    def report_metrics(self):
+        # rolling p50 / p95 / p99 of every source in the log, and the full set in METRICS_FILE
+        try:
+            summary = [f"{'Source':<40} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'items':>7} {'deduped':>7} {'errors':>6}"]
+            for labels in metrics.series("news_source_seconds"):
+                source = dict(labels)["source"]
+                p50, p95, p99 = metrics.quantiles("news_source_seconds", source=source)
+                summary.append(f"{source[:40]:<40} {p50 * 1000:>9.1f} {p95 * 1000:>9.1f} {p99 * 1000:>9.1f} "
+                               f"{metrics.value('news_source_items_total', source=source):>7} "
+                               f"{metrics.value('news_source_deduped_total', source=source):>7} "
+                               f"{metrics.value('news_source_errors_total', source=source):>6}")
+
+            p50, p95, p99 = metrics.quantiles("ticker_frame_seconds")
+            summary.append(f"Store: {self.count_news()} items | Ticker frame: p50 {p50 * 1000:.2f} ms, "
+                           f"p95 {p95 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms")
+            displayException("News source metrics\n" + "\n".join(summary))
+
+            metrics_file = config("METRICS_FILE", default="")
+            if metrics_file:
+                metrics.dump(metrics_file)
 
         except Exception as ex:
-            time.sleep(5)
+            pass
+            displayException(f"Error occurred while reporting metrics. {ex}")
 
-    def run_breaking_news_daemon(self):
-        def scrape_breaking_news_daemon():
-            stop_event = Event()
-            try:
-                while not stop_event.is_set():
-                    Thread(target=self.scrape_breaking_news,
-                           daemon=True).start()
-                    time.sleep(int(config("BREAKING_NEWS_TIMEOUT")))
-                    # time.sleep(3)
+    def merge_latest_news(self, latest_news):
+        return self.store_news(latest_news)
 
-            except Exception as ex:
-                stop_event.set()
+    def merge_breaking_news(self, breaking_news):
+        # news store removes duplicates based on headlines
+        new_headlines = self.store_news(breaking_news)
+        # the same story from another source doesn't interrupt the ticker again
+        new_stories = [news for news in new_headlines
+                       if self.news.is_new_story(news, breaking=True)]
 
-        Thread(target=scrape_breaking_news_daemon, daemon=True).start()
+        if len(new_stories) > 0:
+            # let's replace the contents of breaking news update list with the new headlines
+            with self.update_lock:
+                self.breaking_news_update = new_stories
+            self.publish_news_update("breaking", new_stories)
+
+        return new_headlines
 
     def is_new_breaking_news(self):
-        return len(self.breaking_news_update) > 0
+        return self.breaking_cursor.pending()
 
     def check_latest_news(self):
         return self.count_news() > 0
@@ -335,57 +750,29 @@ class NewsTicker:
     '''
 
     def scrape_breaking_news(self):
-        breaking_news = []
+        breaking_news_headlines = []
+        # download and parse each page only once for this cycle
+        NewsParser.new_cycle()
 
-        breaking_news.extend(self.cnn_breaking_news_latest())
-        breaking_news.extend(self.cnn_breaking_news_subhead())
-        breaking_news.extend(self.twitter_breaking_news())
+        def _merge(breaking_news):
+            nonlocal breaking_news_headlines
+            # news store removes duplicates based on headlines
+            stored_news = self.store_news(breaking_news)
+            new_headlines = [news for news in stored_news
+                             if self.news.is_new_story(news, breaking=True)]
 
-        breaking_news_headlines = []
-        for bn in breaking_news:
-            # remove duplicates based on headlines
-            if bn["headline"].lower() not in [news["headline"].lower() for news in breaking_news_headlines]:
-                breaking_news_headlines.append(bn)
-
-        if len(breaking_news_headlines) > 0:
-            # let's clear the contents of breaking news update list before putting the new headlines
-            self.breaking_news_update = []
-            self.news.extend(breaking_news_headlines)
-            self.breaking_news_update.extend(breaking_news_headlines)
-
-    def cnn_breaking_news_latest(self):
-        breaking_news_headlines = []
-        try:
-            soup = NewsParser("https://cnnphilippines.com")
-            parsed_html = soup.parse_html(
-                "div", {"class": "breaking-news-content runtext-container"})
-            base_url = soup.url
-
-            # we didn't get any breaking news from news channel,
-            # remove values of breaking_news_update list, to flag that we don't have new breaking news
-            # if parsed_html is None:
-            #     self.breaking_news_update = []
-            #     return
-
-            for news in parsed_html:
-                for bn in news.find_all("a", {"class": "fancybox"}):
-                    headline = bn.text.replace(" / ", "").strip()
-                    news_data = {
-                        "breaking_news": "true",
-                        "headline": headline,
-                        "source": "CNN Philippines",
-                        "source url": base_url
-                    }
-                    # if we don't have yet this headline, then append it to a temporary list of headlines
-                    if not any(headline.lower() in breaking_news["headline"].lower() for breaking_news in self.breaking_news_update) and not any(headline.lower() in breaking_news["headline"].lower() for breaking_news in self.news):
-                        breaking_news_headlines.append(news_mapper(news_data))
+            if len(new_headlines) > 0:
+                # let's replace the contents of breaking news update list with this cycle's new headlines
+                with self.update_lock:
+                    breaking_news_headlines = breaking_news_headlines + new_headlines
+                    self.breaking_news_update = breaking_news_headlines
+                self.publish_news_update("breaking", breaking_news_headlines)
 
-        except Exception:
-            pass
-            displayException(
-                "Error occurred while scraping CNN Latest Breaking News.")
+            return stored_news
 
-        return breaking_news_headlines
+        # every page and every twitter account is a separate source, so a slow one won't delay the others
+        fetch_concurrently([source for source, _ in self.build_news_sources(
+            breaking=True)], _merge)
 
     def cnn_breaking_news_subhead(self):
         breaking_news_headlines = []
@@ -433,7 +820,7 @@ class NewsTicker:
                                             "Published", "").strip()
                                         publ_date = convert_time_stamp_to_datetime(
                                             publ_date)
-                                        # publ_date = dt.strptime(publ_date, "%b %d, %Y %I:%M:%S %p").strftime("%A, %d %b %Y %I:%M %p")
+                                        # publ_date = dt.strptime(publ_date, "%b %d, %Y %I:%M:%S %p")
 
                                     news_data = {
                                         "breaking_news": "true",
@@ -444,7 +831,7 @@ class NewsTicker:
                                     }
 
                                 # # if we don't have yet this headline, then append it to a temporary list of headlines
-                                if self.is_within_day(publ_date) and not any(headline.lower() in breaking_news["headline"].lower() for breaking_news in self.breaking_news_update) and not any(headline.lower() in breaking_news["headline"].lower() for breaking_news in self.news):
+                                if self.is_within_day(publ_date) and not self.news.seen(headline):
                                     breaking_news_headlines.append(
                                         news_mapper(news_data))
         except Exception:
@@ -456,84 +843,64 @@ class NewsTicker:
 
     def is_within_day(self, date2):
         try:
-            from datetime import datetime
             if date2 == None:
                 return True
-            today = dt.now().strftime("%A, %d %b %Y %I:%M %p")
-            # convert the strings to datetime objects
-            date1 = datetime.strptime(today, "%A, %d %b %Y %I:%M %p")
-            date2 = datetime.strptime(date2, "%A, %d %b %Y %I:%M %p")
-            # compute the difference between the two dates
-            # date_diff = date1-date2
-            # convert the difference to minutes
-            # minutes = int(date_diff.total_seconds() / 60)
-
-            return True if date1.date() == date2.date() else False
+
+            return parse_time(date2).date() == dt.now().date()
         except Exception as ex:
             raise Exception(ex)
 
-    def twitter_breaking_news(self):
+    def twitter_news_sources(self, news_source):
+        # a twitter list returns the tweets of all its members with a single request
+        if news_source.get("list"):
+            return [self.twitter_timeline_source(
+                self.twitter.list_timeline, news_source["list"], news_source, f"Twitter list {news_source['list']}")]
+
+        # otherwise one source per twitter account, so every timeline can be fetched in parallel
+        return [self.twitter_timeline_source(self.twitter.user_timeline, account, news_source, f"Twitter @{account}")
+                for account in news_source["accounts"]]
+
+    def twitter_timeline_source(self, timeline, account, news_source, name):
+        def _fetch_tweets():
+            try:
+                # limit the number of timeline requests in flight to twitter
+                with twitter_slots:
+                    # only the tweets posted since the last poll of this account (or list)
+                    tweets = timeline(account, count=news_source.get("count", 20))
+            except Exception as ex:
+                pass
+                displayException(f"Error occurred while reading {name}. {ex}", count_error=True)
+                return []
+            return self.parse_tweets(tweets, news_source.get("keywords"), news_source.get("timezone offset", 0))
+
+        _fetch_tweets.__name__ = name
+        return _fetch_tweets
+
+    def parse_tweets(self, tweets, keywords=None, timezone_offset=0):
         breaking_news_headlines = []
-        try:
-            # Creating the authentication object
-            auth = tweepy.OAuthHandler(
-                config("CONSUMER_KEY"), config("CONSUMER_SECRET"))
-            # Setting your access token and secret
-            auth.set_access_token(config("ACCESS_TOKEN"),
-                                  config("ACCESS_TOKEN_SECRET"))
-            # Creating the API object while passing in the auth information
-            api = tweepy.API(auth)
-
-            def _get_tweets(tweets, isBreakingNews=False):
-                for tweet in tweets:
-                    created_at = tweet.created_at.strftime(
-                        "%A, %d %b %Y %I:%M %p")
-                    # +8 hours
-                    created_at = dt.strptime(
-                        created_at, "%A, %d %b %Y %I:%M %p") + timedelta(hours=8)
-
-                    created_at = created_at.strftime("%A, %d %b %Y %I:%M %p")
-
-                    # filter tweets that was created today
-                    if self.is_within_day(created_at) and (isBreakingNews or ("breaking news" in tweet.full_text.lower() or "breaking:" in tweet.full_text.lower() or "just in:" in tweet.full_text.lower())):
-                        headline = tweet.full_text.replace(
-                            "BREAKING:", "").replace("BREAKING NEWS:", "").strip()
-
-                        news_data = {
-                            "breaking_news": "true",
-                            "headline": headline,
-                            "time": created_at,
-                            "source": tweet.user.name,
-                            "source url": f"https://twitter.com/i/web/status/{tweet.id}"
-                        }
-
-                        # if we don't have yet this headline, then append it to a temporary list of headlines
-                        if not any(headline.lower() in breaking_news["headline"].lower() for breaking_news in self.breaking_news_update) and not any(headline.lower() in breaking_news["headline"].lower() for breaking_news in self.news):
-                            breaking_news_headlines.append(
-                                news_mapper(news_data))
-
-            for source in {"BBCBreaking", "breakingnews",
-                           "CNNBreaking", "cnnbrk"}:
-                try:
-                    result = api.user_timeline(
-                        id=source, count=10, tweet_mode="extended")
-                    _get_tweets(result, True)
-                except Exception:
-                    continue
 
-            for source in {"CNN", "NBCNews", "ABC", "CBSNews", "FoxNews", "nytimes", "washingtonpost", "Reuters", "AP",
-                           "ABSCBNNews", "gmanews", "philstar", "inquirerdotnet", "rapplerdotcom", "cnnphilippines", "inquirerdotnet", "bworldph"}:
-                try:
-                    # if api.get_user(source).verified:
-                    result = api.user_timeline(
-                        id=source, count=20, tweet_mode="extended")
-                    _get_tweets(result)
-                except Exception:
-                    continue
+        for tweet in tweets:
+            created_at = tweet.created_at.replace(
+                tzinfo=None, second=0, microsecond=0) + timedelta(hours=timezone_offset)
+
+            # filter tweets that was created today, without keywords every tweet is breaking news
+            if self.is_within_day(created_at) and (not keywords or any(
+                    keyword in tweet.full_text.lower() for keyword in keywords)):
+                headline = tweet.full_text.replace(
+                    "BREAKING:", "").replace("BREAKING NEWS:", "").strip()
+
+                news_data = {
+                    "breaking_news": "true",
+                    "headline": headline,
+                    "time": created_at,
+                    "source": tweet.user.name,
+                    "source url": f"https://twitter.com/i/web/status/{tweet.id}"
+                }
+
+                # if we don't have yet this headline, then append it to a temporary list of headlines
+                if not self.news.seen(headline):
+                    breaking_news_headlines.append(news_mapper(news_data))
 
-        except Exception:
-            pass
-            print("Error occurred while scraping Twitter Breaking News.")
         return breaking_news_headlines
 
     '''
@@ -541,71 +908,165 @@ class NewsTicker:
     '''
 
     def scrape_latest_news(self):
-        latest_news = []
-        latest_news.extend(self.cnn_news_latest())
-        latest_news.extend(self.google_news_latest())
+        NewsParser.new_cycle()
+        fetch_concurrently([source for source, _ in self.build_news_sources(
+            breaking=False)], self.store_news)
 
-        for news_item in latest_news:
-            self.news.append(news_item)
+    '''
+    News Sources
+    '''
 
-    def cnn_news_latest(self):
-        latest_news = []
-        try:
-            soup = NewsParser("https://cnnphilippines.com/latest")
-            parsed_html = soup.parse_html("article", {"class": "media"})
-            base_url = soup.base_url
+    def build_news_sources(self, breaking=True):
+        # (source, poll interval) of every worker needed for the registered news sources
+        breaking_news_timeout = config("BREAKING_NEWS_TIMEOUT", cast=float)
+        default_interval = breaking_news_timeout if breaking else config(
+            "LATEST_NEWS_TIMEOUT", default=300, cast=float)
+        twitter_timeout = config(
+            "TWITTER_POLL_INTERVAL", default=breaking_news_timeout, cast=float)
+
+        sources = []
+        pages = {}
+
+        for news_source in self.news_sources:
+            if bool(news_source.get("breaking", False)) != breaking:
+                continue
+
+            if news_source["type"] == "twitter":
+                for twitter_source in self.twitter_news_sources(news_source):
+                    sources.append(
+                        (twitter_source, news_source.get("interval", twitter_timeout)))
+            else:
+                # sources reading the same page are polled together, so the page is downloaded once
+                pages.setdefault(news_source.get("url") or news_source["name"], []).append(
+                    news_source)
 
-            for elem in parsed_html:
-                headline = elem.find("h4").find(
-                    "a").text.replace("\xa0", " ").strip()
+        for page_sources in pages.values():
+            sources.append((self.page_news_source(page_sources), min(
+                news_source.get("interval", default_interval) for news_source in page_sources)))
 
-                # don't append if we already have this headline in the list
-                if not any(headline.lower() in hl["headline"].lower() for hl in self.news):
-                    paragraphs = elem.find_all("p")
-                    time_stamp = convert_time_stamp_to_datetime(
-                        paragraphs[0].text.strip())
+        return sources
 
-                    # check if the news time is within 24hrs
-                    if self.is_within_day(time_stamp):
-                        source_url = base_url + \
-                            elem.find("h4").find("a")["href"]
-                        story = paragraphs[1].text.strip()
-
-                        news_data = {
-                            "headline": headline,
-                            "time": time_stamp,
-                            "source": "CNN Philippines",
-                            "source url": source_url,
-                            "story": story
-                        }
-                        latest_news.append(news_mapper(news_data))
+    def page_news_source(self, news_sources):
+        def _scrape_page():
+            news_items = []
+            for news_source in news_sources:
+                news_items.extend(self.scrape_news_source(news_source))
+            return news_items
 
-        except Exception as ex:
-            pass
-            displayException(
-                f"CNN latest news website is not in correct format. {ex}")
+        _scrape_page.__name__ = " + ".join(news_source["name"]
+                                           for news_source in news_sources)
+        return _scrape_page
+
+    def scrape_news_source(self, news_source):
+        # twitter sources never get here, build_news_sources gives each account (or list) its own worker
+        source_type = news_source["type"]
+
+        if source_type == "html":
+            return self.scrape_html_source(news_source)
 
-        return latest_news
+        if source_type == "rss":
+            return NewsParser(news_source["url"]).parse_feed(
+                news_source.get("timezone offset", 0), news_source.get("breaking", False), self.seen_guids)
+
+        if source_type == "custom":
+            return getattr(self, news_source["method"])()
+
+        displayException(
+            f"Unknown type of news source {news_source['name']}: {source_type}", logging.WARNING)
+        return []
+
+    def scrape_html_source(self, news_source):
+        news_items = []
+        fields = news_source.get("fields", {})
 
-    def google_news_latest(self):
-        latest_news_feed = []
         try:
-            parser = NewsParser(
-                "https://news.google.com/rss?hl=en-PH&gl=PH&ceid=PH:en")
-            latest_news_feed = parser.parse_feed()
+            soup = NewsParser(news_source["url"])
+            containers = soup.parse_html(*news_source["container"])
+            # relative times of the page are counted from the same "now"
+            now = dt.now()
+
+            for container in containers:
+                entries = container.select(
+                    news_source["entry"]) if news_source.get("entry") else [container]
+
+                for entry in entries:
+                    headline = self.select_text(
+                        entry, fields.get("headline"), news_source.get("remove", []))
+
+                    # don't append if we already have this headline in the list
+                    if not headline or self.news.seen(headline):
+                        continue
+
+                    time_stamp = None
+                    if fields.get("time") is not None:
+                        time_stamp = self.select_text(entry, fields["time"])
+                        if news_source.get("time format", "relative") == "relative":
+                            time_stamp = convert_time_stamp_to_datetime(
+                                time_stamp, now)
+                        else:
+                            time_stamp = dt.strptime(
+                                time_stamp, news_source["time format"])
+
+                    # check if the news time is within 24hrs
+                    if not self.is_within_day(time_stamp):
+                        continue
+
+                    source_url = news_source["url"]
+                    if fields.get("link") is not None:
+                        link = self.select_field(entry, fields["link"])
+                        if link is not None and link.get("href"):
+                            source_url = urljoin(news_source["url"], link["href"])
+
+                    news_data = {
+                        "breaking_news": "true" if news_source.get("breaking", False) else "false",
+                        "headline": headline,
+                        "time": time_stamp,
+                        "source": news_source.get("source", news_source["name"]),
+                        "source url": source_url,
+                        "story": self.select_text(entry, fields.get("story"))
+                    }
+                    news_items.append(news_mapper(news_data))
 
         except Exception as ex:
             pass
             displayException(
-                f"Google News Feed is not in correct format. {ex}")
+                f"{news_source['name']} website is not in correct format. {ex}", count_error=True)
+
+        return news_items
+
+    def select_field(self, element, selector):
+        # "" is the element itself, [selector, index] is the n-th match of the selector
+        if selector == "":
+            return element
+
+        if isinstance(selector, (list, tuple)):
+            selector, idx = selector
+            matches = element.select(selector)
+            return matches[idx] if len(matches) > idx else None
 
-        return latest_news_feed
+        return element.select_one(selector)
+
+    def select_text(self, element, selector, remove=()):
+        field = self.select_field(element, selector) if selector is not None else None
+        if field is None:
+            return ""
+
+        text = field.text.replace("\xa0", " ")
+        for unwanted_text in remove:
+            text = text.replace(unwanted_text, "")
+        return text.strip()
 
     '''
     News Reporting (formatted)
     '''
 
-    def cast_latest_news(self, meta_data=""):
+    def search_news(self, keywords, prefix=False):
+        # look up the search index instead of scanning every headline
+        matched_news = [news_item for news_item in self.news.search(
+            keywords, prefix) if self.is_within_day(news_item.time_stamp)]
+        return sorted(matched_news, key=lambda feed: feed.time_stamp, reverse=True)
+
+    def cast_latest_news(self, meta_data="", prefix=False):
         cast_news = []
 
         try:
@@ -614,22 +1075,23 @@ class NewsTicker:
                 print("\n **No new headlines found.")
                 return list()
 
-            for news in self.get_news():
-                headline = news["headline"]
-                source = news['source']
-                is_breaking = news['breaking_news']
-                time_stamp = convert_datetime_to_time_stamp(news['time'])
+            # filter news report using meta_data keyword found in "headline", "story" and "source" section
+            news_list = self.search_news(
+                meta_data, prefix) if meta_data else self.get_news(one_per_story=True)
+            # every item of this cast is timed against the same "now"
+            now = dt.now()
+
+            for news in news_list:
+                headline = news.headline
+                source = news.source
+                is_breaking = "true" if news.breaking else "false"
+                time_stamp = convert_datetime_to_time_stamp(news.time_stamp, now)
 
                 report = f"From {source} ({time_stamp}).\n\n{headline}."
 
-                if headline and meta_data:
-                    # filter news report using meta_data keyword found in "headline" and "story" section
-                    if is_match(meta_data.lower(), (headline.split(" ") + source.split(" "))):
-                        cast_news.append(
-                            {"headline": headline, "report": report, "breaking_news": is_breaking, "source url": news["source url"]})
-                elif headline:
+                if headline:
                     cast_news.append(
-                        {"headline": headline, "report": report, "breaking_news": is_breaking, "source url": news["source url"]})
+                        {"headline": headline, "report": report, "breaking_news": is_breaking, "source url": news.source_url})
 
         except Exception:
             pass
@@ -639,20 +1101,23 @@ class NewsTicker:
 
     def cast_breaking_news(self, on_demand=False):
         cast_news = []
-        news_updates = self.breaking_news_update
-
         try:
             if on_demand:
-                news_updates = [news for news in self.get_news(
-                ) if news["breaking_news"].lower() == "true"]
-            elif len(news_updates) < 1:
+                news_updates = self.news.breaking(
+                    *self.today_range(), one_per_story=True)
+            else:
+                # every breaking news story is casted once
+                news_updates = self.breaking_cursor.read()
+
+            if len(news_updates) < 1:
                 # return immediately if no list of headlines to show
                 return list()
 
+            now = dt.now()
             for news in news_updates:
-                headline = news["headline"].strip()
-                source = news['source']
-                time_stamp = convert_datetime_to_time_stamp(news["time"])
+                headline = news.headline.strip()
+                source = news.source
+                time_stamp = convert_datetime_to_time_stamp(news.time_stamp, now)
 
                 report = f"From {source} ({time_stamp}).\n\n{headline}."
 
@@ -664,7 +1129,7 @@ class NewsTicker:
                 if headline:
                     # cast_news.append(report)
                     cast_news.append(
-                        {"headline": headline, "report": report, "source url": news["source url"]})
+                        {"headline": headline, "report": report, "source url": news.source_url})
 
         except Exception:
             pass
@@ -672,54 +1137,106 @@ class NewsTicker:
 
         return cast_news
 
-    def fetch_news(self, news_file=""):
+    def open_news_file(self, news_file=""):
         date_now = dt.now().strftime('%A, %d %b %Y')
         self.news_file = f"{config('NEWS_DIR')}/News/News-{date_now}.json"
 
         if news_file:
             self.news_file = news_file
 
+        # new headlines are appended to the day's journal as soon as they are scraped
+        journal_file = f"{os.path.splitext(self.news_file)[0]}.jsonl"
+        if self.journal is None or self.journal.path != journal_file:
+            self.journal = NewsJournal(journal_file)
+
+    def fetch_news(self, news_file=""):
+        self.news_file_override = news_file
+        self.open_news_file(news_file)
+
         try:
-            def _save_as_json():
-                # create the list of news as json type file
-                with open(self.news_file, "w", encoding="utf-8") as fw:
-                    news = {
-                        "news": self.get_news()
-                    }
-                    fw.write(json.dumps(news, indent=4,
-                             sort_keys=True, ensure_ascii=False))
+            # first run with a new archive, bring in the history we already have in the daily files
+            if self.archive is not None and self.archive.count() == 0:
+                self.import_news_files()
 
             self.load_news_from_json()
             # scrape news from various websites
             self.scrape_breaking_news()
             self.scrape_latest_news()
+            self.report_metrics()
 
-            # there are changes
-            if self.changed_news_count == 0 or (self.count_news() != self.changed_news_count):
-                # save the scraped news to json file
-                _save_as_json()
-                # let's remember the number of news from json that we loaded.
-                # this will be our reference if there are changes/additional news where discovered/scraped
-                self.changed_news_count = self.count_news()
+            # make sure we have the json export of today's news
+            if not os.path.isfile(self.news_file):
+                with self.save_lock:
+                    self.compact_news()
 
         except Exception as ex:
             pass
             displayException(
                 f"Error occurred while fetching news. {ex}", logging.CRITICAL)
 
+    def import_news_files(self, news_dir=None):
+        # migrate the daily News-<date>.json / .jsonl files into the archive
+        if news_dir is None:
+            news_dir = f"{config('NEWS_DIR')}/News"
+
+        imported_count = 0
+        for news_file in sorted(glob.glob(os.path.join(news_dir, "News-*.json*"))):
+            try:
+                if news_file.endswith(".jsonl"):
+                    news = list(NewsJournal(news_file).load())
+                else:
+                    with open(news_file, "r", encoding="utf-8") as fr:
+                        news = json.load(fr)["news"]
+
+                imported_count += self.archive.add(
+                    [news_mapper(news_item) for news_item in news])
+            except Exception as ex:
+                pass
+                displayException(
+                    f"Error occurred while importing {news_file} to archive. {ex}")
+
+        return imported_count
+
+    def get_archived_news(self, hours=24, source=None, breaking_only=False, limit=None):
+        # query the archive without loading all of it into memory
+        if self.archive is None:
+            return []
+
+        since = dt.now() - timedelta(hours=hours) if hours else None
+        return [news_mapper(news_item) for news_item in self.archive.query(since, source, breaking_only, limit)]
+
+    def compact_news(self):
+        # callers hold save_lock, so nothing is appended while the journal is rewritten
+        news = [news_item.serialize() for news_item in self.get_news()]
+        self.journal.compact(news)
+        # the pretty printed json file is kept as an export
+        self.journal.export_json(self.news_file, news)
+        # let's remember the number of news we saved
+        self.changed_news_count = self.count_news()
+
     def load_news_from_json(self):
         try:
-            date_now = dt.now().strftime("%A, %d %b %Y")
-
-            if self.count_news() == 0 and os.path.isfile(self.news_file):
-                # create the list of news as json type file
-                with open(self.news_file, "r", encoding="utf-8") as fw:
-                    news = json.load(fw)
-                    self.news = [news for news in news["news"] if dt.strptime(
-                        news["time"], "%A, %d %b %Y %I:%M %p").strftime("%A, %d %b %Y") == date_now]
-                    # let's remember the number of news from json that we loaded.
-                    # this will be our reference if there are changes/additional news where discovered/scraped
-                    self.changed_news_count = self.count_news()
+            date_now = dt.now().date()
+
+            if self.count_news() == 0:
+                if self.journal is not None and self.journal.exists():
+                    # stream the journal line by line
+                    news = self.journal.load()
+                elif os.path.isfile(self.news_file):
+                    # no journal yet, read the json export instead
+                    with open(self.news_file, "r", encoding="utf-8") as fw:
+                        news = json.load(fw)["news"]
+                else:
+                    return
+
+                news = (news_mapper(news_item) for news_item in news)
+                self.news.extend(
+                    [news_item for news_item in news if news_item.time_stamp.date() == date_now])
+                # breaking news from the file were casted before the restart
+                self.breaking_cursor.skip()
+                # let's remember the number of news from json that we loaded.
+                # this will be our reference if there are changes/additional news where discovered/scraped
+                self.changed_news_count = self.count_news()
 
                 # for breaking_news in self.news:
                 #     # if we don't have yet this headline, then append it to a temporary list of headlines
@@ -734,123 +1251,140 @@ class NewsTicker:
         source_color = "\033[1;36;49m"
         color_reset = "\033[0;39;49m"
 
-        headline = "{} {} ".format(title_color, news["headline"])
-        story = "{} {} ".format(color_reset, news["story"])
-        source = "{} {}".format(source_color, news["source url"])
+        headline = "{} {} ".format(title_color, news.headline)
+        story = "{} {} ".format(color_reset, news.story)
+        source = "{} {}".format(source_color, news.source_url)
 
         print(headline)
         print("{}more on{}".format(story, source), "\n")
 
-    def show_news(self, isBanner=True):
-        news_idx = 0
-        current_news = []
+    def create_news_ticker(self, news, news_idx, news_count, isBreakingNews=False):
+        window_height = "90 /NOT"
 
-        if self.count_news() < 1:
-            # return immediately if no list of headlines to show
-            print("\n No headlines found. **Check your internet connection...")
-            return
+        if isBreakingNews:
+            window_height = "110 /TOP"
 
-        top_50_latest_news = self.get_news()
-        if len(top_50_latest_news) > 50:
-            top_50_latest_news = top_50_latest_news[:50]
+        # resize the window only when switching between latest and breaking news
+        if window_height != self.window_height:
+            self.window_height = window_height
+            os.system(
+                f"CMDOW @ /ren \"News Watcher\" /mov 11 -31 /siz 1550 {window_height}")
 
-        def _create_news_ticker(isBreakingNews=False):
-            news_list = top_50_latest_news
-            window_height = "90 /NOT"
+        breaking_red_color = "\033[1;37;41m"
+        # connection_red_color = "\033[1;31;49m"
+        color_reset = "\033[2;39;49m"
 
-            if isBreakingNews:
-                window_height = "110 /TOP"
-                news_list = self.breaking_news_update
-                isBreakingNews = True
+        headline = news.headline
+        source = news.source
+        time_stamp = convert_datetime_to_time_stamp(news.time_stamp)
 
-            os.system(
-                f"CMDOW @ /ren \"News Watcher\" /mov 11 -31 /siz 1550 {window_height}")
+        formatted_headline = f"{headline} - {source} | {time_stamp} ({news_idx} of {news_count})"
+        ticker_detail = formatted_headline.center(168)
+        deets_length = len(ticker_detail)
 
-            breaking_red_color = "\033[1;37;41m"
-            # connection_red_color = "\033[1;31;49m"
-            color_reset = "\033[2;39;49m"
+        # headline is almost full row..
+        if len(formatted_headline) > 165:
+            # let's break it into separate sentence/paragraph.
+            words = ticker_detail.split(" ")
+            half = (len(words) // 2)
 
-            headline = current_news["headline"]
-            source = current_news["source"]
-            time_stamp = convert_datetime_to_time_stamp(current_news["time"])
+            sentences = [f"{' '.join(words[:half]).strip()}".center(168),
+                         f"{' '.join(words[half:]).strip()}.".center(168)]
+        else:
+            sentences = [ticker_detail]
 
-            formatted_headline = f"{headline} - {source} | {time_stamp} ({news_idx} of {len(news_list)})"
-            ticker_detail = formatted_headline.center(168)
-            deets_length = len(ticker_detail)
+        # a breaking news update cuts the latest news headline short
+        interrupt = None if isBreakingNews else self.breaking_news_event.is_set
+        headline_style = color_reset if isBreakingNews else ""
+        counter = 0
+        while True:
+            counter += 2
 
-            counter = 0
-            while True:
-                os.system("clear")
+            rows = [[("", "")], [("", "")]]
+            if isBreakingNews:
+                breaking_title = " * BREAKING NEWS * "
+                rows.append([(" " * ((168 - len(breaking_title)) // 2), ""),
+                             (breaking_title, breaking_red_color)])
 
-                counter += 2
+            for sentence in sentences:
+                size = len(sentence)
                 # slice some parts of headline to make a scrolling effect
-                animate_ticker_details = ticker_detail[counter:(
-                    deets_length + counter)] + ticker_detail[0:counter]
-
-                print("\n")
-                if isBreakingNews:
-                    print(
-                        f"       {breaking_red_color} * BREAKING NEWS * {color_reset}".center(180))
-
-                # headline is almost full row..
-                if len(formatted_headline) > 165:
-                    # let's break it into separate sentence/paragraph.
-                    words = ticker_detail.split(" ")
-                    half = (len(words) // 2)
-
-                    sentence = f"{' '.join(words[:half]).strip()}".center(168)
-                    size = len(sentence)
-                    print(
-                        f"{sentence[counter:(size + counter)] + sentence[0:counter]}")
-
-                    sentence = f"{' '.join(words[half:]).strip()}.".center(168)
-                    size = len(sentence)
-                    print(
-                        f"{sentence[counter:(size + counter)] + sentence[0:counter]}")
+                rows.append(
+                    [(sentence[counter:(size + counter)] + sentence[0:counter], headline_style)])
 
-                else:
-                    # show the headline news
-                    print(f"{animate_ticker_details}")
+            self.renderer.draw(rows)
+
+            if interrupt is not None and interrupt():
+                return
+
+            # pause for sometime before scrolling forward the headline
+            if counter == 2 and not self.renderer.hold(3, interrupt):
+                return
+
+            # pause for sometime before moving to next headline
+            if counter >= deets_length:
+                self.renderer.hold(3, interrupt)
+                return
+
+    def display_news(self, news, news_idx, news_count, isBanner, isBreakingNews=False):
+        if isBanner:
+            self.create_news_banner(news)
+            self.renderer.hold(
+                3, None if isBreakingNews else self.breaking_news_event.is_set)
+        else:
+            self.create_news_ticker(news, news_idx, news_count, isBreakingNews)
 
-                # pause for sometime before scrolling forward the headline
-                if counter == 2:
-                    time.sleep(3)
+    def consume_news_updates(self, breaking_news, breaking_cursor):
+        # clear first, a story added while reading sets it again and is picked up on the next check
+        self.breaking_news_event.clear()
 
-                # pause for sometime before moving to next headline
-                if counter >= deets_length:
-                    time.sleep(3)
-                    break
+        # every breaking news story added since the last check, none of them is dropped
+        new_breaking_news = breaking_cursor.read()
+        return new_breaking_news if new_breaking_news else breaking_news
+
+    def show_news(self, isBanner=True):
+        if self.count_news() < 1:
+            # return immediately if no list of headlines to show
+            print("\n No headlines found. **Check your internet connection...")
+            return
 
         # initialize text coloring
         init(autoreset=True)
 
+        # draws the ticker in-process, writing only the cells that changed between frames
+        if self.renderer is None:
+            self.renderer = TerminalRenderer()
+        if not isBanner:
+            self.renderer.clear()
+
+        # fetching runs in the background and never blocks the display
+        self.run_news_daemon()
+        breaking_news = list(self.breaking_news_update)
+        breaking_cursor = self.news.breaking_cursor()
+
         while True:
-            for idx, news in enumerate(top_50_latest_news):
+            # every pass starts from the latest snapshot of the store
+            # one headline per story, the same story from other sources is skipped
+            top_50_latest_news = self.get_news(50, one_per_story=True)
 
-                # halt "latest news" ticker and display the breaking news
-                if self.is_new_breaking_news() and (idx + 1) % 2 != 0:
-                    for breaking_idx, breakingnews in enumerate(self.breaking_news_update):
-                        news_idx = breaking_idx + 1
-                        current_news = breakingnews
+            for idx, news in enumerate(top_50_latest_news):
+                has_breaking_update = self.breaking_news_event.is_set()
+                breaking_news = self.consume_news_updates(breaking_news, breaking_cursor)
 
-                        if isBanner:
-                            self.create_news_banner(breakingnews)
-                        else:
-                            _create_news_ticker(isBreakingNews=True)
+                # halt "latest news" ticker and display the breaking news, right away when a new one arrived
+                if breaking_news and (has_breaking_update or (idx + 1) % 2 != 0):
+                    for breaking_idx, breakingnews in enumerate(breaking_news):
+                        self.display_news(breakingnews, breaking_idx + 1,
+                                          len(breaking_news), isBanner, isBreakingNews=True)
 
                 # continue "latest news" ticker
-                news_idx = idx + 1
-                current_news = news
+                self.display_news(news, idx + 1, len(
+                    top_50_latest_news), isBanner)
 
-                if isBanner:
-                    self.create_news_banner(news)
-                else:
-                    _create_news_ticker()
-
-            os.system("clear")
-            print("\nFetching information from news channels...", end="")
-            self.fetch_news()
-            self.show_news(isBanner)
+            if not top_50_latest_news:
+                # nothing from today yet, wait for the fetchers
+                self.renderer.hold(5, self.breaking_news_event.is_set)
+                breaking_news = self.consume_news_updates(breaking_news, breaking_cursor)
 
 
 if __name__ == "__main__":
@@ -861,12 +1395,13 @@ if __name__ == "__main__":
         try:
             print("\nFetching information from news channels...", end="")
             news.fetch_news()
-            news.run_breaking_news_daemon()
+            news.run_news_daemon()
             news.show_news(False)
 
         except KeyboardInterrupt:
             pass
             displayException("Keyboard Interrupt", ex_type=logging.DEBUG)
+            news.stop_breaking_news_daemon(timeout=5)
             break
         except Exception:
             pass
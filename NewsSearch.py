@@ -0,0 +1,87 @@
+from bisect import bisect_left, insort
+from threading import RLock
+from NewsText import tokenize
+
+
+def has_phrase(field_tokens, query_tokens, prefix=False):
+    # query tokens must appear next to each other, the last one may be a prefix of a word
+    size = len(query_tokens)
+    for idx in range(len(field_tokens) - size + 1):
+        last_token = field_tokens[idx + size - 1]
+        if field_tokens[idx:idx + size - 1] == query_tokens[:-1] and \
+                (last_token.startswith(query_tokens[-1]) if prefix else last_token == query_tokens[-1]):
+            return True
+    return False
+
+
+class NewsSearchIndex:
+
+    def __init__(self):
+        # token -> keys of the news containing it (headline, story or source)
+        self._postings = {}
+        # sorted tokens, used for prefix lookups
+        self._vocabulary = []
+        # key -> (news item, tokens of each field)
+        self._documents = {}
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add(self, key, news_item):
+        fields = (tokenize(news_item.headline), tokenize(
+            news_item.story), tokenize(news_item.source))
+
+        with self._lock:
+            self._documents[key] = (news_item, fields)
+
+            for token in set(fields[0] + fields[1] + fields[2]):
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = set()
+                    insort(self._vocabulary, token)
+                postings.add(key)
+
+    def clear(self):
+        with self._lock:
+            self._postings = {}
+            self._vocabulary = []
+            self._documents = {}
+
+    def search(self, query, prefix=False):
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            postings = []
+            for idx, token in enumerate(query_tokens):
+                if prefix and idx == len(query_tokens) - 1:
+                    token_postings = self._prefix_postings(token)
+                else:
+                    token_postings = self._postings.get(token)
+
+                if not token_postings:
+                    return []
+                postings.append(token_postings)
+
+            # start from the rarest token, so the work depends on the number of matches
+            postings.sort(key=len)
+            matches = [key for key in postings[0] if all(
+                key in token_postings for token_postings in postings[1:])]
+
+            if len(query_tokens) > 1:
+                matches = [key for key in matches if any(has_phrase(
+                    field, query_tokens, prefix) for field in self._documents[key][1])]
+
+            return [self._documents[key][0] for key in matches]
+
+    def _prefix_postings(self, prefix):
+        postings = set()
+        idx = bisect_left(self._vocabulary, prefix)
+
+        while idx < len(self._vocabulary) and self._vocabulary[idx].startswith(prefix):
+            postings |= self._postings[self._vocabulary[idx]]
+            idx += 1
+
+        return postings
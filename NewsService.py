@@ -0,0 +1,164 @@
+import os
+import json
+import socket
+import logging
+from datetime import datetime as dt
+from threading import Lock, Thread
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from decouple import config
+from NewsScraper import NewsTicker, displayException
+from NewsMetrics import metrics
+
+
+class UnixHTTPServer(ThreadingHTTPServer):
+
+    def __init__(self, *args, **kwargs):
+        # looked up here and not in the class body, windows has no AF_UNIX and still imports this module
+        self.address_family = socket.AF_UNIX
+        super().__init__(*args, **kwargs)
+
+    def server_bind(self):
+        # a socket file left by a previous run would make bind() fail
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+class NewsService:
+
+    def __init__(self, ticker, host=None, port=None, socket_path=None):
+        self.ticker = ticker
+        self.host = host if host is not None else config(
+            "NEWS_SERVICE_HOST", default="127.0.0.1")
+        self.port = port if port is not None else config(
+            "NEWS_SERVICE_PORT", default=8765, cast=int)
+        # serve on a unix socket instead of tcp when it's set
+        self.socket_path = socket_path if socket_path is not None else config(
+            "NEWS_SERVICE_SOCKET", default="")
+
+        # (route, query, prefix, limit, offset) -> (store version, minute, response body)
+        self.responses = {}
+        self.responses_lock = Lock()
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        service = self
+
+        class _NewsRequestHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if urlparse(self.path).path.rstrip("/") == "/metrics":
+                    # prometheus text format, never cached
+                    status, body = 200, metrics.prometheus_text().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                else:
+                    status, body = service.respond(self.path)
+                    content_type = "application/json; charset=utf-8"
+
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                displayException(f"News service: {format % args}", logging.DEBUG)
+
+        if self.socket_path and not hasattr(socket, "AF_UNIX"):
+            displayException(
+                f"Unix sockets are not supported here, serving on {self.host}:{self.port} instead.", logging.WARNING)
+            self.socket_path = ""
+
+        if self.socket_path:
+            self.server = UnixHTTPServer(self.socket_path, _NewsRequestHandler)
+        else:
+            self.server = ThreadingHTTPServer((self.host, self.port), _NewsRequestHandler)
+        self.server.daemon_threads = True
+
+        self.thread = Thread(target=self.server.serve_forever,
+                             name="NewsService", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def respond(self, path):
+        url = urlparse(path)
+        parameters = parse_qs(url.query)
+        route = url.path.rstrip("/")
+
+        try:
+            query = parameters.get("q", [""])[0].strip()
+            prefix = parameters.get("prefix", ["false"])[0].lower() in ("1", "true", "yes")
+            limit = max(int(parameters.get("limit", ["20"])[0]), 0)
+            offset = max(int(parameters.get("offset", ["0"])[0]), 0)
+        except ValueError:
+            return 400, self._encode({"error": "limit and offset must be numbers"})
+
+        if route not in ("/latest", "/breaking", "/search"):
+            return 404, self._encode({"error": f"unknown path {url.path}"})
+        if route == "/search" and not query:
+            return 400, self._encode({"error": "missing search query q"})
+
+        # a response stays valid until the store changes, or the minute changes its "x mins ago"
+        key = (route, query, prefix, limit, offset)
+        version = self.ticker.news.version
+        minute = int(dt.now().timestamp() // 60)
+
+        response = self.responses.get(key)
+        if response is not None and response[0] == version and response[1] == minute:
+            return 200, response[2]
+
+        body = self._encode(self._page(route, query, prefix, limit, offset, version))
+        with self.responses_lock:
+            # drop the responses of older versions, nobody will ask for them again
+            if any(cached[:2] != (version, minute) for cached in self.responses.values()):
+                self.responses = {cached_key: cached for cached_key, cached in self.responses.items()
+                                  if cached[:2] == (version, minute)}
+            self.responses[key] = (version, minute, body)
+
+        return 200, body
+
+    def _page(self, route, query, prefix, limit, offset, version):
+        if route == "/latest":
+            news = self.ticker.cast_latest_news()
+        elif route == "/breaking":
+            news = self.ticker.cast_breaking_news(on_demand=True)
+        else:
+            news = self.ticker.cast_latest_news(query, prefix)
+
+        return {
+            "version": version,
+            "total": len(news),
+            "offset": offset,
+            "limit": limit,
+            "news": news[offset:offset + limit]
+        }
+
+    def _encode(self, content):
+        return json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+
+if __name__ == "__main__":
+    # run the scrapers and answer news queries of the voice assistant from the same store
+    ticker = NewsTicker()
+    ticker.fetch_news()
+    ticker.run_news_daemon()
+    service = NewsService(ticker).start()
+
+    print(f"Serving news on {service.socket_path or f'http://{service.host}:{service.port}'}")
+    try:
+        service.thread.join()
+    except KeyboardInterrupt:
+        pass
+        displayException("Keyboard Interrupt", ex_type=logging.DEBUG)
+        service.stop()
+        ticker.stop_breaking_news_daemon(timeout=5)
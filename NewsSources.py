@@ -0,0 +1,100 @@
+import json
+from decouple import config
+
+
+# Every news outlet we poll. Adding an outlet only needs a new entry here (or in NEWS_SOURCES_FILE).
+#
+# name              unique name of the source, used in logs
+# type              "rss", "html", "twitter" or "custom" (a NewsTicker method that returns news)
+# url               page or feed to download, sources with the same url are polled together
+# breaking          true for breaking news sources, false for latest news sources
+# interval          seconds between polls, defaults to BREAKING_NEWS_TIMEOUT / LATEST_NEWS_TIMEOUT
+# timezone offset   hours to add to the published time of rss entries and tweets
+#
+# html sources:
+# container         find_all() arguments of the elements holding the news, only these are parsed
+# entry             css selector of each news item inside a container (the container itself when missing)
+# fields            css selector of "headline", "link", "time" and "story" inside an entry,
+#                   [selector, index] picks the n-th match, "" is the entry itself
+# remove            text to remove from the headline
+# time format       "relative" when the time reads like "5 mins ago"
+# source            name of the outlet shown on the ticker
+#
+# twitter sources:
+# accounts          twitter accounts to read, each one is fetched separately
+# count             number of tweets per account (or list)
+# list              optional twitter list ("owner/slug" or its id) with the accounts,
+#                   all of them are read with one request instead of one request per account
+# keywords          only tweets containing one of these are kept, every tweet when missing
+NEWS_SOURCES = [
+    {
+        "name": "CNN Philippines Breaking News",
+        "type": "html",
+        "url": "https://cnnphilippines.com",
+        "breaking": True,
+        "container": ["div", {"class": "breaking-news-content runtext-container"}],
+        "entry": "a.fancybox",
+        "fields": {"headline": ""},
+        "remove": [" / "],
+        "source": "CNN Philippines"
+    },
+    {
+        "name": "CNN Philippines Breaking News Subhead",
+        "type": "custom",
+        "url": "https://cnnphilippines.com",
+        "breaking": True,
+        "method": "cnn_breaking_news_subhead"
+    },
+    {
+        "name": "Twitter Breaking News",
+        "type": "twitter",
+        "breaking": True,
+        "accounts": ["BBCBreaking", "breakingnews", "CNNBreaking", "cnnbrk"],
+        "count": 10,
+        "timezone offset": 8
+    },
+    {
+        "name": "Twitter News",
+        "type": "twitter",
+        "breaking": True,
+        "accounts": ["CNN", "NBCNews", "ABC", "CBSNews", "FoxNews", "nytimes", "washingtonpost", "Reuters", "AP",
+                     "ABSCBNNews", "gmanews", "philstar", "inquirerdotnet", "rapplerdotcom", "cnnphilippines", "bworldph"],
+        "count": 20,
+        "keywords": ["breaking news", "breaking:", "just in:"],
+        "timezone offset": 8
+    },
+    {
+        "name": "CNN Philippines Latest News",
+        "type": "html",
+        "url": "https://cnnphilippines.com/latest",
+        "container": ["article", {"class": "media"}],
+        "fields": {"headline": "h4 a", "link": "h4 a", "time": ["p", 0], "story": ["p", 1]},
+        "time format": "relative",
+        "source": "CNN Philippines"
+    },
+    {
+        "name": "Google News",
+        "type": "rss",
+        "url": "https://news.google.com/rss?hl=en-PH&gl=PH&ceid=PH:en",
+        "timezone offset": 8
+    }
+]
+
+
+def load_news_sources():
+    # NEWS_SOURCES_FILE is a json list of extra sources in the same format as NEWS_SOURCES
+    news_sources = list(NEWS_SOURCES)
+    news_sources_file = config("NEWS_SOURCES_FILE", default="")
+
+    if news_sources_file:
+        with open(news_sources_file, "r", encoding="utf-8") as fr:
+            news_sources.extend(json.load(fr))
+
+    return news_sources
+
+
+def get_news_source(name, news_sources=None):
+    for news_source in (news_sources if news_sources is not None else NEWS_SOURCES):
+        if news_source["name"] == name:
+            return news_source
+    raise KeyError(name)
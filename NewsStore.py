@@ -0,0 +1,297 @@
+import time
+from bisect import bisect_left, insort
+from itertools import islice
+from threading import RLock
+from NewsSearch import NewsSearchIndex
+from NewsClusters import NewsClusterIndex
+from NewsText import tokenize
+
+
+def headline_fingerprint(headline):
+    # lowercase and collapse whitespace, so trivial formatting differences map to the same key
+    return " ".join(str(headline).lower().split())
+
+
+class NewsSnapshot:
+    # the store as it was at one version, never modified once it's published
+    __slots__ = ("version", "items", "by_time", "breaking_by_time")
+
+    def __init__(self, version=0, items=(), by_time=(), breaking_by_time=()):
+        self.version = version
+        # insertion order
+        self.items = items
+        # (time_stamp, -insertion sequence, news item) in ascending order
+        self.by_time = by_time
+        self.breaking_by_time = breaking_by_time
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+class NewsCursor:
+    # each consumer reads every breaking news story once, at its own pace
+
+    def __init__(self, store, position=0):
+        self.store = store
+        self.position = position
+
+    def read(self):
+        news_items, self.position = self.store.read_breaking(self.position)
+        return news_items
+
+    def pending(self):
+        return self.store.breaking_position() > self.position
+
+    def skip(self):
+        # forget what's published so far, only read what comes after this
+        self.position = self.store.breaking_position()
+
+
+class NewsStore:
+
+    def __init__(self, news_items=None):
+        # fingerprint -> news item (insertion ordered)
+        self._items = {}
+        # token -> set of fingerprints, used for the "headline is part of another headline" check
+        self._token_index = {}
+        # (time_stamp, -insertion sequence, news item) in ascending order, kept sorted on insert
+        self._by_time = []
+        self._breaking_by_time = []
+        # full-text index over headline, story and source, updated on every insert
+        self.search_index = NewsSearchIndex()
+        # near-duplicate headlines from different sources are grouped into the same story
+        self.story_index = NewsClusterIndex()
+        # stories that have a (breaking) item, and the fingerprints of the items that started them
+        self._stories = set()
+        self._breaking_stories = set()
+        self._story_starts = set()
+        self._breaking_story_starts = set()
+        # (position of the first item, breaking news stories in the order they were added),
+        # append only, cursors remember how far they have read
+        self._breaking_log = (0, [])
+        # bumped once per add, extend or clear that changed the store
+        self.version = 0
+        self._snapshot = NewsSnapshot()
+        # scrapers from different threads merge into the same store
+        self._lock = RLock()
+
+        if news_items:
+            self.extend(news_items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def __contains__(self, headline):
+        return headline_fingerprint(headline) in self._items
+
+    def get(self, headline, default=None):
+        return self._items.get(headline_fingerprint(headline), default)
+
+    def add(self, news_item):
+        with self._lock:
+            if not self._insert(news_item):
+                return False
+            self._publish()
+        return True
+
+    def extend(self, news_items):
+        # returns only the items that were actually added, readers see the whole batch at once
+        with self._lock:
+            added = [news_item for news_item in news_items if self._insert(news_item)]
+            if added:
+                self._publish()
+            return added
+
+    def _insert(self, news_item):
+        fingerprint = headline_fingerprint(news_item.headline)
+
+        with self._lock:
+            # we already have this headline
+            if not fingerprint or fingerprint in self._items:
+                return False
+
+            self._items[fingerprint] = news_item
+            for token in set(tokenize(fingerprint)):
+                self._token_index.setdefault(token, set()).add(fingerprint)
+
+            # equal times keep their insertion order when read newest first
+            time_key = (news_item.time_stamp, -len(self._items), news_item)
+            insort(self._by_time, time_key)
+            if news_item.breaking:
+                insort(self._breaking_by_time, time_key)
+
+            self.search_index.add(fingerprint, news_item)
+
+            story = self.story_index.add(fingerprint, news_item.headline)
+            if story not in self._stories:
+                self._stories.add(story)
+                self._story_starts.add(fingerprint)
+            if news_item.breaking and story not in self._breaking_stories:
+                self._breaking_stories.add(story)
+                self._breaking_story_starts.add(fingerprint)
+                self._breaking_log[1].append(news_item)
+
+        return True
+
+    def _publish(self):
+        # the snapshot of the new version is built by the first reader that asks for it, a writer adding
+        # headlines one by one doesn't copy the whole store every time
+        self.version += 1
+
+    def clear(self):
+        with self._lock:
+            self._items = {}
+            self._token_index = {}
+            self._by_time = []
+            self._breaking_by_time = []
+            self.search_index.clear()
+            self.story_index.clear()
+            self._stories = set()
+            self._breaking_stories = set()
+            self._story_starts = set()
+            self._breaking_story_starts = set()
+            self._breaking_log = (self.breaking_position(), [])
+            self._publish()
+
+    def top(self, count=None, since=None, until=None, one_per_story=False):
+        # newest first, without sorting the whole store
+        return self._time_range(self.snapshot().by_time, since, until, count, one_per_story)
+
+    def since(self, since, until=None):
+        return self._time_range(self.snapshot().by_time, since, until)
+
+    def breaking(self, since=None, until=None, count=None, one_per_story=False):
+        return self._time_range(self.snapshot().breaking_by_time, since, until, count, one_per_story)
+
+    def snapshot(self):
+        # readers share the snapshot of the latest version, it's copied at most once per version
+        snapshot = self._snapshot
+        if snapshot.version == self.version:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot.version != self.version:
+                self._snapshot = NewsSnapshot(self.version, tuple(self._items.values()),
+                                              tuple(self._by_time), tuple(self._breaking_by_time))
+            return self._snapshot
+
+    def breaking_cursor(self, from_start=False):
+        return NewsCursor(self, 0 if from_start else self.breaking_position())
+
+    def breaking_position(self):
+        offset, breaking_log = self._breaking_log
+        return offset + len(breaking_log)
+
+    def read_breaking(self, position):
+        # breaking news stories added after position, and the position to read from next
+        offset, breaking_log = self._breaking_log
+        news_items = breaking_log[max(position - offset, 0):]
+        return news_items, max(position, offset) + len(news_items)
+
+    def _time_range(self, by_time, since=None, until=None, count=None, one_per_story=False):
+        start = bisect_left(by_time, (since,)) if since is not None else 0
+        end = bisect_left(by_time, (until,)) if until is not None else len(by_time)
+        news_range = (by_time[idx][2] for idx in range(end - 1, start - 1, -1))
+        if one_per_story:
+            news_range = self.one_per_story(news_range)
+        return list(islice(news_range, count))
+
+    def story(self, news_item):
+        return self.story_index.story(headline_fingerprint(news_item.headline))
+
+    def one_per_story(self, news_items):
+        # the first item of every story, the others are the same story from another source
+        stories = set()
+        for news_item in news_items:
+            story = self.story(news_item)
+            if story not in stories:
+                stories.add(story)
+                yield news_item
+
+    def is_new_story(self, news_item, breaking=False):
+        # the item was the first one of its story (or its first breaking news) when it was added
+        story_starts = self._breaking_story_starts if breaking else self._story_starts
+        return headline_fingerprint(news_item.headline) in story_starts
+
+    def search(self, query, prefix=False):
+        # keyword / phrase lookup, costs time proportional to the matching news
+        return self.search_index.search(query, prefix)
+
+    def seen(self, headline):
+        fingerprint = headline_fingerprint(headline)
+
+        if not fingerprint:
+            return False
+
+        if fingerprint in self._items:
+            return True
+
+        # the first and last tokens of the headline can be partial words of a longer headline,
+        # only the tokens in between are guaranteed to be whole words on both sides.
+        inner_tokens = tokenize(fingerprint)[1:-1]
+
+        with self._lock:
+            if not inner_tokens:
+                # too short to use the index, fallback to scanning all headlines
+                return any(fingerprint in news for news in self._items)
+
+            postings = [self._token_index.get(token) for token in set(inner_tokens)]
+            if not all(postings):
+                return False
+
+            # only the headlines that have all the inner tokens can contain the fingerprint,
+            # intersect starting from the rarest token so the candidates shrink as fast as possible
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return False
+
+            return any(fingerprint in news for news in candidates)
+
+
+if __name__ == "__main__":
+    # benchmark: cost of one fetch cycle (60 scraped headlines) as the store grows
+    import random
+    from types import SimpleNamespace
+
+    random.seed(1)
+    vocabulary = [f"word{idx}" for idx in range(5000)]
+
+    def _random_headline():
+        return " ".join(random.choice(vocabulary) for _ in range(random.randint(6, 16)))
+
+    store = NewsStore()
+    for size in (1000, 10000, 100000):
+        while len(store) < size:
+            store.extend([SimpleNamespace(headline=_random_headline(), story="", source="", time_stamp=time.time(), breaking=False)
+                          for _ in range(size - len(store))])
+
+        known = [news.headline for news in random.sample(list(store), 30)]
+        scraped = [headline.split(" ", 1)[1] for headline in known] + \
+            [_random_headline() for _ in range(30)]
+
+        # a scraper merges its new headlines in one batch
+        start = time.perf_counter()
+        store.extend([SimpleNamespace(headline=headline, story="", source="", time_stamp=time.time(), breaking=False)
+                      for headline in scraped if not store.seen(headline)])
+        elapsed = time.perf_counter() - start
+
+        # a breaking news source adds its headlines one by one, the reader copies the store once
+        start = time.perf_counter()
+        for _ in range(30):
+            store.add(SimpleNamespace(headline=_random_headline(), story="", source="", time_stamp=time.time(), breaking=True))
+        added = (time.perf_counter() - start) / 30
+        start = time.perf_counter()
+        store.top(50)
+        read = time.perf_counter() - start
+
+        print(f"{size:>7} items | fetch cycle: {elapsed * 1000:.3f} ms | per headline: {elapsed / len(scraped) * 1e6:.1f} us"
+              f" | add: {added * 1e6:.1f} us | first read: {read * 1000:.3f} ms")
@@ -0,0 +1,14 @@
+import re
+
+
+# words of a headline, the store, the search index and the story clusters all split text the same way
+TOKEN_PATTERN = re.compile(r"\w+")
+URL_PATTERN = re.compile(r"https?://\S+")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+def has_url(text):
+    return URL_PATTERN.search(text) is not None
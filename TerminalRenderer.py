@@ -0,0 +1,145 @@
+import sys
+import time
+from decouple import config
+from NewsMetrics import metrics
+
+
+RESET_STYLE = "\033[0m"
+
+
+class TerminalRenderer:
+
+    def __init__(self, fps=None, stream=None):
+        self.fps = fps if fps is not None else config(
+            "TICKER_FPS", default=30, cast=float)
+        self.frame_time = 1 / self.fps if self.fps > 0 else 0
+        self.stream = stream if stream is not None else sys.stdout
+
+        # front buffer is what's on the screen, rows of (character, style) cells
+        self.front = []
+        self.next_frame_at = None
+        self.frame_count = 0
+
+    def clear(self):
+        self.front = []
+        self.stream.write(f"{RESET_STYLE}\033[2J\033[H")
+        self.stream.flush()
+
+    def draw(self, rows):
+        # rows is a list of [(text, style), ...] segments, only the cells that changed are written
+        start = time.perf_counter()
+        back = [self._to_cells(segments) for segments in rows]
+        output = []
+
+        for row_idx in range(max(len(back), len(self.front))):
+            new_row = back[row_idx] if row_idx < len(back) else []
+            old_row = self.front[row_idx] if row_idx < len(self.front) else []
+            output.append(self._diff_row(row_idx, old_row, new_row))
+
+        output = "".join(output)
+        if output:
+            self.stream.write(f"{output}{RESET_STYLE}")
+            self.stream.flush()
+
+        self.front = back
+        self.frame_count += 1
+        metrics.observe("ticker_frame_seconds", time.perf_counter() - start)
+        self._wait_for_next_frame()
+
+    def hold(self, seconds, interrupt=None):
+        # keep the current frame on screen, nothing is written while it doesn't change
+        until = time.perf_counter() + seconds
+        while time.perf_counter() < until:
+            if interrupt is not None and interrupt():
+                return False
+            self._wait_for_next_frame()
+        return True
+
+    def _wait_for_next_frame(self):
+        # pace frames to a fixed rate, the time spent drawing is deducted from the wait
+        now = time.perf_counter()
+        if self.next_frame_at is None or now - self.next_frame_at > self.frame_time:
+            self.next_frame_at = now
+
+        self.next_frame_at += self.frame_time
+        delay = self.next_frame_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _to_cells(self, segments):
+        cells = []
+        for text, style in segments:
+            cells.extend((character, style) for character in text)
+        return cells
+
+    def _diff_row(self, row_idx, old_row, new_row):
+        output = []
+        blank = (" ", "")
+        current_style = None
+        col = 0
+        width = max(len(old_row), len(new_row))
+
+        while col < width:
+            new_cell = new_row[col] if col < len(new_row) else blank
+            old_cell = old_row[col] if col < len(old_row) else None
+
+            if new_cell == old_cell:
+                col += 1
+                continue
+
+            # move the cursor to the start of a run of changed cells
+            output.append(f"\033[{row_idx + 1};{col + 1}H")
+
+            while col < width:
+                new_cell = new_row[col] if col < len(new_row) else blank
+                old_cell = old_row[col] if col < len(old_row) else None
+                if new_cell == old_cell:
+                    break
+
+                character, style = new_cell
+                if style != current_style:
+                    output.append(RESET_STYLE + style)
+                    current_style = style
+
+                output.append(character)
+                col += 1
+
+        return "".join(output)
+
+
+if __name__ == "__main__":
+    # benchmark: frames per second and cpu per frame of a scrolling headline, compared to a full redraw
+    import io
+    import os
+
+    headline = "Sample headline for the news ticker renderer benchmark - CNN Philippines | about 5 mins ago (1 of 50)".center(168)
+    frames = 2000
+
+    for title, full_redraw in (("full redraw", True), ("frame diff", False)):
+        stream = io.StringIO()
+        renderer = TerminalRenderer(fps=0, stream=stream)
+
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        for counter in range(frames):
+            offset = counter % len(headline)
+            rows = [[("", "")], [("", "")],
+                    [(" * BREAKING NEWS * ".center(168), "\033[1;37;41m")],
+                    [(headline[offset:] + headline[:offset], "")]]
+            if full_redraw:
+                renderer.front = []
+            renderer.draw(rows)
+        elapsed_wall = time.perf_counter() - start_wall
+        elapsed_cpu = time.process_time() - start_cpu
+
+        print(f"{title:<11} | {frames / elapsed_wall:,.0f} fps | {elapsed_cpu / frames * 1e6:.1f} us cpu/frame | {len(stream.getvalue()) / frames:.0f} bytes/frame")
+
+    # what every frame used to cost before drawing anything: a shell subprocess for "clear"
+    shell_frames = 100
+    start_wall = time.perf_counter()
+    children_cpu = sum(os.times()[2:4])
+    for _ in range(shell_frames):
+        os.system("exit 0")
+    elapsed_wall = time.perf_counter() - start_wall
+    elapsed_cpu = sum(os.times()[2:4]) - children_cpu
+    print(f"{'os.system':<11} | {shell_frames / elapsed_wall:,.0f} fps | {elapsed_cpu / shell_frames * 1e6:.1f} us cpu/frame (subprocess only)")
@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import tweepy
+from threading import Lock
+from decouple import config
+from NewsFiles import atomic_write
+
+
+class RecordedTwitterApi:
+    # offline stand-in for tweepy.API, replays the tweets recorded by TwitterClient(record_file=...)
+
+    def __init__(self, path):
+        with open(path, "r", encoding="utf-8") as fr:
+            self.recording = json.load(fr)
+        self.last_response = None
+        self.request_count = 0
+
+    def user_timeline(self, screen_name, count=20, since_id=None, **kwargs):
+        return self._replay("user_timeline", screen_name, count, since_id)
+
+    def list_timeline(self, list_id=None, owner_screen_name=None, slug=None, count=20, since_id=None, **kwargs):
+        twitter_list = str(list_id) if list_id else f"{owner_screen_name}/{slug}"
+        return self._replay("list_timeline", twitter_list, count, since_id)
+
+    def _replay(self, endpoint, key, count, since_id):
+        self.request_count += 1
+        tweets = [tweet for tweet in self.recording.get(endpoint, {}).get(key, [])
+                  if since_id is None or tweet["id"] > since_id]
+
+        # same order as twitter, latest first
+        tweets.sort(key=lambda tweet: tweet["id"], reverse=True)
+        return [tweepy.models.Status.parse(None, tweet) for tweet in tweets[:count]]
+
+
+class TwitterClient:
+
+    def __init__(self, api=None, cursor_file=None, record_file=None):
+        self._api = api
+        # account (or list) -> id of the latest tweet we read, saved so a restart doesn't read the timelines again
+        self.cursor_file = cursor_file if cursor_file is not None else config(
+            "TWITTER_CURSORS", default=os.path.join(config("NEWS_DIR", default=""), "TwitterCursors.json"))
+        self.record_file = record_file if record_file is not None else config(
+            "TWITTER_RECORD", default="")
+        self.cursors = self._load_cursors()
+        # endpoint -> [requests left, time.time() when the window resets]
+        self.rate_limits = {}
+        self._lock = Lock()
+
+    @property
+    def api(self):
+        # a single api object for the life of the ticker, every worker shares its connection
+        with self._lock:
+            if self._api is None:
+                replay_file = config("TWITTER_REPLAY", default="")
+                if replay_file:
+                    self._api = RecordedTwitterApi(replay_file)
+                else:
+                    # Creating the authentication object
+                    auth = tweepy.OAuthHandler(
+                        config("CONSUMER_KEY"), config("CONSUMER_SECRET"))
+                    # Setting your access token and secret
+                    auth.set_access_token(config("ACCESS_TOKEN"),
+                                          config("ACCESS_TOKEN_SECRET"))
+                    # Creating the API object while passing in the auth information
+                    self._api = tweepy.API(auth)
+            return self._api
+
+    def user_timeline(self, account, count=20):
+        return self._fetch("user_timeline", account, count, screen_name=account)
+
+    def list_timeline(self, twitter_list, count=200):
+        # twitter_list is the id of the list, or "owner/slug"
+        twitter_list = str(twitter_list)
+        if twitter_list.isdigit():
+            parameters = {"list_id": twitter_list}
+        else:
+            owner, slug = twitter_list.split("/", 1)
+            parameters = {"owner_screen_name": owner, "slug": slug}
+
+        return self._fetch("list_timeline", f"list:{twitter_list}", count, **parameters)
+
+    def _fetch(self, endpoint, cursor, count, **parameters):
+        # the endpoint ran out of requests, skip this poll instead of waiting for the window to reset
+        if not self._take_request(endpoint):
+            return []
+
+        since_id = self.cursors.get(cursor)
+        if since_id is not None:
+            parameters["since_id"] = since_id
+
+        api = self.api
+        try:
+            tweets = getattr(api, endpoint)(
+                count=count, tweet_mode="extended", **parameters)
+        except tweepy.TooManyRequests as ex:
+            self._update_rate_limit(endpoint, ex.response, exhausted=True)
+            return []
+
+        self._update_rate_limit(endpoint, getattr(api, "last_response", None))
+
+        if tweets:
+            with self._lock:
+                self.cursors[cursor] = max(
+                    [tweet.id for tweet in tweets] + [since_id or 0])
+                self._save_cursors()
+                if self.record_file:
+                    self._record(endpoint, cursor, tweets)
+
+        return tweets
+
+    def _take_request(self, endpoint):
+        with self._lock:
+            rate_limit = self.rate_limits.get(endpoint)
+            if rate_limit is None or time.time() >= rate_limit[1]:
+                return True
+            if rate_limit[0] <= 0:
+                return False
+
+            # other workers see one request less until twitter tells us the actual count
+            rate_limit[0] -= 1
+            return True
+
+    def _update_rate_limit(self, endpoint, response, exhausted=False):
+        headers = getattr(response, "headers", None) or {}
+        reset = headers.get("x-rate-limit-reset")
+        remaining = 0 if exhausted else headers.get("x-rate-limit-remaining")
+
+        if reset is None or remaining is None:
+            if exhausted:
+                # no headers, twitter's rate limit windows are 15 minutes long
+                reset = time.time() + 15 * 60
+            else:
+                return
+
+        with self._lock:
+            self.rate_limits[endpoint] = [int(remaining), float(reset)]
+
+    def _load_cursors(self):
+        if not self.cursor_file or not os.path.isfile(self.cursor_file):
+            return {}
+
+        try:
+            with open(self.cursor_file, "r", encoding="utf-8") as fr:
+                return {cursor: int(since_id) for cursor, since_id in json.load(fr).items()}
+        except (ValueError, AttributeError):
+            # unreadable cursors only cost us one full read of every timeline
+            return {}
+
+    def _save_cursors(self):
+        if self.cursor_file:
+            atomic_write(self.cursor_file, json.dumps(
+                self.cursors, indent=4, sort_keys=True))
+
+    def _record(self, endpoint, cursor, tweets):
+        # raw tweets by endpoint and account (or list), the format RecordedTwitterApi replays
+        recording = {}
+        if os.path.isfile(self.record_file):
+            with open(self.record_file, "r", encoding="utf-8") as fr:
+                recording = json.load(fr)
+
+        key = cursor[len("list:"):] if endpoint == "list_timeline" else cursor
+        recorded = {tweet["id"]: tweet for tweet in recording.setdefault(
+            endpoint, {}).get(key, [])}
+        recorded.update((tweet.id, tweet._json) for tweet in tweets)
+        recording[endpoint][key] = sorted(
+            recorded.values(), key=lambda tweet: tweet["id"], reverse=True)
+
+        atomic_write(self.record_file, json.dumps(
+            recording, indent=4, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    # offline demo: tweets downloaded per poll with and without since_id cursors, against a recorded timeline
+    import tempfile
+    from datetime import datetime as dt, timedelta
+
+    accounts = ["BBCBreaking", "breakingnews", "CNNBreaking", "cnnbrk"]
+    polls = 20
+    temp_dir = tempfile.mkdtemp()
+    replay_file = os.path.join(temp_dir, "recording.json")
+
+    # every account posts one tweet between polls
+    start = dt(2020, 1, 1, 8, 0)
+    recording = {"user_timeline": {account: [{
+        "id": account_idx * 1000 + tweet_idx,
+        "created_at": (start + timedelta(minutes=tweet_idx)).strftime("%a %b %d %H:%M:%S +0000 %Y"),
+        "full_text": f"{account} tweet {tweet_idx}",
+        "user": {"name": account, "screen_name": account}
+    } for tweet_idx in range(1, 10 + polls + 1)] for account_idx, account in enumerate(accounts)}}
+
+    with open(replay_file, "w", encoding="utf-8") as fw:
+        json.dump(recording, fw)
+
+    for title, use_cursors in (("no cursors", False), ("since_id", True)):
+        api = RecordedTwitterApi(replay_file)
+        client = TwitterClient(api, cursor_file=os.path.join(
+            temp_dir, f"cursors-{use_cursors}.json"), record_file="")
+        tweet_count = 0
+
+        for poll in range(polls):
+            # tweets newer than this poll aren't out yet
+            for account_idx, account in enumerate(accounts):
+                api.recording["user_timeline"][account] = [
+                    tweet for tweet in recording["user_timeline"][account] if tweet["id"] % 1000 <= 10 + poll]
+                if not use_cursors:
+                    client.cursors = {}
+                tweet_count += len(client.user_timeline(account, count=10))
+
+        print(f"{title:<10} | {api.request_count} requests | {tweet_count} tweets downloaded | {tweet_count / api.request_count:.1f} tweets/request")
+
+    restarted = TwitterClient(RecordedTwitterApi(replay_file), cursor_file=os.path.join(
+        temp_dir, "cursors-True.json"), record_file="")
+    print(f"restarted  | {sum(len(restarted.user_timeline(account)) for account in accounts)} tweets downloaded, only the ones newer than the saved cursors")
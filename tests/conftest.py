@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# the modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# keep the log of the tests out of the working directory
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.mkdtemp(), "NewsScraper.log"))
@@ -0,0 +1,83 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from HttpSession import HttpSession
+
+
+BODY = ("<html><body>" + "<div class='teaser'>headline</div>" * 2000 + "</body></html>").encode()
+ETAG = '"{}"'.format(hashlib.md5(BODY).hexdigest())
+
+
+@pytest.fixture
+def stub_server():
+    counters = {"connections": 0, "bytes": 0}
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            counters["connections"] += 1
+
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.send_header("ETag", ETAG)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+            counters["bytes"] += len(BODY)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/", counters
+    server.shutdown()
+    server.server_close()
+
+
+def test_polling_reuses_the_connection_and_the_unchanged_body(stub_server):
+    url, counters = stub_server
+    session = HttpSession(retries=0)
+
+    responses = [session.get(url) for _ in range(10)]
+
+    # one handshake for all the cycles, the body is only sent the first time
+    assert counters["connections"] == 1
+    assert counters["bytes"] == len(BODY)
+    assert not responses[0].not_modified
+    assert all(response.not_modified and response.content == BODY for response in responses[1:])
+    assert session.stats["not_modified"] == 9
+
+
+def test_not_modified_response_is_a_copy(stub_server):
+    url, _ = stub_server
+    session = HttpSession(retries=0)
+
+    first = session.get(url)
+    second = session.get(url)
+
+    # the response kept for the conditional requests (and already handed out) is left as it was
+    assert second is not first
+    assert second.not_modified
+    assert not first.not_modified
+    assert not session.validators[url].not_modified
+
+
+def test_validators_keep_only_the_latest_urls(stub_server):
+    url, _ = stub_server
+    session = HttpSession(retries=0, validators_limit=2)
+
+    for path in ("a", "b", "c"):
+        session.get(url + path)
+
+    assert list(session.validators) == [url + "b", url + "c"]
@@ -0,0 +1,174 @@
+from NewsScraper import fetch_concurrently
+
+
+def test_fetch_concurrently_merges_the_sources_that_did_not_fail():
+    def good_source():
+        return ["good"]
+
+    def failing_source():
+        raise ValueError("boom")
+
+    def other_source():
+        return ["other"]
+
+    merged = []
+
+    def merge(news_items):
+        merged.extend(news_items)
+        return news_items
+
+    fetch_concurrently([good_source, failing_source, other_source], merge, deadline=5)
+    assert sorted(merged) == ["good", "other"]
+
+
+def test_convert_time_stamp_to_datetime_reads_relative_times():
+    from datetime import datetime, timedelta
+    from NewsScraper import convert_time_stamp_to_datetime
+
+    now = datetime(2020, 10, 18, 16, 5)
+    expected = {
+        "about Just now": now,
+        "about 5 mins ago": now - timedelta(minutes=5),
+        "a min ago": now - timedelta(minutes=1),
+        "about an hour ago": now - timedelta(hours=1),
+        "about 2 hours ago": now - timedelta(hours=2),
+        "a day ago": now - timedelta(days=1),
+        "About A Day Ago": now - timedelta(days=1),
+        "Oct 18, 2020 4:05:00 PM": now
+    }
+    for time_stamp, date_time in expected.items():
+        assert convert_time_stamp_to_datetime(time_stamp, now) == date_time, time_stamp
+
+
+def test_source_errors_are_counted_once_and_messages_are_not(monkeypatch):
+    import logging
+    from HttpSession import shared_session
+    from NewsMetrics import metrics
+    from NewsScraper import NewsTicker, displayException
+
+    class FailingSession:
+        # every download fails, the sources catch the error and carry on with nothing
+        def get(self, url):
+            raise ConnectionError(f"Max retries exceeded with url: {url}")
+
+    monkeypatch.setattr(shared_session, "stand_in", FailingSession())
+
+    def chatty_page_source():
+        displayException("Nothing new on the page.", logging.INFO)
+        displayException("The page was slow.", logging.WARNING)
+        return []
+
+    ticker = NewsTicker()
+    failing_feed_source = ticker.page_news_source(
+        [{"name": "Failing feed source", "type": "rss", "url": "https://example.com/failing/rss"}])
+    failing_page_source = ticker.page_news_source(
+        [{"name": "Failing page source", "type": "html", "url": "https://example.com/failing/",
+          "container": ["div"], "fields": {"headline": "h2"}}])
+
+    merged = []
+    fetch_concurrently([chatty_page_source, failing_feed_source, failing_page_source], merged.extend, deadline=5)
+
+    assert merged == []
+    assert metrics.value("news_source_errors_total", source="chatty_page_source") == 0
+    assert metrics.value("news_source_errors_total", source="Failing feed source") == 1
+    assert metrics.value("news_source_errors_total", source="Failing page source") == 1
+    # one series per source, whatever the urls it downloads
+    assert metrics.value("news_fetch_responses_total", source="Failing feed source", status="error") == 1
+
+
+def test_fetch_concurrently_keeps_the_results_that_arrive_during_a_slow_merge():
+    import time
+
+    def fast_source():
+        return ["fast"]
+
+    def medium_source():
+        time.sleep(0.3)
+        return ["medium"]
+
+    merged = []
+
+    def merge(news_items):
+        merged.extend(news_items)
+        # the deadline passes while merging, the medium source is done by then
+        time.sleep(0.6)
+        return news_items
+
+    fetch_concurrently([fast_source, medium_source], merge, deadline=0.5)
+    assert merged == ["fast", "medium"]
+
+
+def test_fetch_concurrently_deadline_starts_when_the_source_runs():
+    import time
+    from NewsScraper import source_pool
+
+    # more sources than workers, the last ones are queued for a while before they run
+    def queued_source():
+        time.sleep(0.3)
+        return ["queued"]
+
+    merged = []
+    fetch_concurrently([queued_source] * (source_pool._max_workers + 2), merged.extend, deadline=0.5)
+    assert len(merged) == source_pool._max_workers + 2
+
+
+def test_expired_pages_are_dropped_without_a_new_cycle():
+    import time
+    from threading import Lock
+    from NewsScraper import NewsParser
+
+    now = time.time()
+    busy = Lock()
+    busy.acquire()
+    NewsParser.page_cache = {"old": (now - NewsParser.page_cache_ttl - 1, "", b"", None, {}),
+                             "fresh": (now, "", b"", None, {})}
+    NewsParser.page_locks = {"old": Lock(), "fresh": Lock(), "failed": Lock(), "downloading": busy}
+
+    NewsParser.drop_expired_pages(now)
+
+    assert list(NewsParser.page_cache) == ["fresh"]
+    assert sorted(NewsParser.page_locks) == ["downloading", "fresh"]
+    NewsParser.new_cycle()
+
+
+def test_breaking_news_after_midnight_goes_to_the_new_day_journal(tmp_path, monkeypatch):
+    from datetime import datetime
+    import NewsScraper
+    from NewsScraper import News, NewsTicker
+
+    monkeypatch.setenv("NEWS_DIR", str(tmp_path))
+    (tmp_path / "News").mkdir()
+
+    class Today(datetime):
+        day = datetime(2020, 10, 18, 23, 59)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.day
+
+    monkeypatch.setattr(NewsScraper, "dt", Today)
+    ticker = NewsTicker()
+    ticker.open_news_file()
+    yesterday = ticker.journal.path
+
+    Today.day = datetime(2020, 10, 19, 0, 1)
+    ticker.merge_breaking_news([News(True, "Breaking story after midnight", Today.day, "Test")])
+
+    assert ticker.journal.path != yesterday
+    assert "19 Oct 2020" in ticker.journal.path
+
+
+def test_each_ticker_ingests_the_feed_entries_on_its_own(monkeypatch):
+    from NewsScraper import NewsTicker, NewsParser
+
+    entries = [{"guid": f"guid-{idx}", "title": f"Feed headline {idx} - Test", "link": "",
+                "published": "Sun, 18 Oct 2020 08:05:00 GMT", "description": "", "source": "Test"}
+               for idx in range(3)]
+    monkeypatch.setattr(NewsParser, "read_feed", lambda self: iter(entries))
+    news_source = {"name": "Test feed", "type": "rss", "url": "https://example.com/rss"}
+
+    first, second = NewsTicker(), NewsTicker()
+    assert len(first.scrape_news_source(news_source)) == 3
+    # the same ticker skips what it already ingested, another ticker still gets everything
+    assert len(first.scrape_news_source(news_source)) == 0
+    assert len(second.scrape_news_source(news_source)) == 3